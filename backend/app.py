@@ -3,24 +3,46 @@
 
 ### `backend/app.py`
 
-from flask import Flask, render_template, session, redirect, jsonify
+from flask import Flask, Response, render_template, session, redirect, jsonify, send_file, stream_with_context
+import database as db
+import risk
 from database import init_db
 from auth import auth
 from flask import request
-from exam_manager import get_exam_questions, calculate_score
-import sqlite3
+import exports
+from exam_manager import bump_question_version, calculate_score, get_question_bank, question_cache
+from report_generator import jobs as report_jobs
+from question_import import ImportFormatError, SUPPORTED_EXTENSIONS, import_questions, summarize_errors
+from proctor_ai import lifecycle, metrics, runtime
+from proctor_ai.profiler import install_signal_handler, profiler
+from proctoring import list_presence, record_heartbeat, record_violation, snapshot_writer
+from snapshots import thumbnail_url
+from storage import S3_APP_PREFIX, get_storage
+from write_behind import writer
+from stream import register_stream
 from datetime import datetime
-import csv
 import base64
-import os
-import uuid
+import multiprocessing
 
 
 app = Flask(__name__)
 app.secret_key = "exam_secret"
 
-init_db()
 app.register_blueprint(auth)
+app.teardown_request(lambda _exc: db.release_thread_connections())
+app.add_template_filter(thumbnail_url, "thumbnail")
+
+# Analyzer workers (PROCTOR_EXECUTION_MODE=process) are spawned and re-import
+# this module as __mp_main__ under "python app.py". Only the serving process
+# migrates the database, opens the stream endpoint, takes over SIGUSR2 and
+# warms the models.
+if multiprocessing.parent_process() is None:
+    init_db()
+    register_stream(app)
+    install_signal_handler()
+
+    if lifecycle.WARM_UP_ON_START:
+        lifecycle.start()
 
 
 @app.route("/api/auth/login", methods=["POST"])
@@ -33,7 +55,7 @@ def api_login():
     if not username or not password or role not in {"student", "admin"}:
         return jsonify({"error": "Invalid credentials payload"}), 400
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute(
         "SELECT role FROM users WHERE username=? AND password=? AND role=?",
@@ -55,7 +77,7 @@ def api_student_dashboard():
     if "user" not in session or session.get("role") != "student":
         return jsonify({"error": "Unauthorized"}), 403
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute(
         """
@@ -95,7 +117,7 @@ def api_search_exam():
     if not exam_code:
         return jsonify({"error": "Exam code required"}), 400
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT exam_code FROM exams WHERE exam_code = ?", (exam_code,))
     exists = cur.fetchone()
@@ -112,7 +134,7 @@ def api_admin_dashboard():
     if "user" not in session or session.get("role") != "admin":
         return jsonify({"error": "Unauthorized"}), 403
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT exam_code, title FROM exams ORDER BY id DESC")
     exams = [{"exam_code": row[0], "title": row[1]} for row in cur.fetchall()]
@@ -127,9 +149,14 @@ def api_admin_dashboard():
         ORDER BY users.username
         """
     )
-    students = [{"username": row[0], "attempts": row[1], "risk_score": 0} for row in cur.fetchall()]
+    students = cur.fetchall()
+    risk_scores = risk.student_scores(cur)
     conn.close()
 
+    students = [
+        {"username": row[0], "attempts": row[1], "risk_score": risk_scores.get(row[0], 0)} for row in students
+    ]
+
     return jsonify({"students": students, "exams": exams})
 
 
@@ -138,7 +165,7 @@ def api_admin_dashboard():
 def student_dashboard():
     if "user" not in session or session["role"] != "student":
         return redirect("/")
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
 
     cur.execute("""
@@ -173,7 +200,7 @@ def student_dashboard():
 def admin_dashboard():
     if "user" not in session or session["role"] != "admin":
         return redirect("/admin-login")
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
 
     cur.execute("SELECT exam_code, title, description FROM exams ORDER BY id DESC")
@@ -189,51 +216,7 @@ def admin_dashboard():
     """)
     students = cur.fetchall()
 
-    cur.execute("""
-        SELECT user, type, COUNT(*) as count
-        FROM violations
-        GROUP BY user, type
-    """)
-    violation_rows = cur.fetchall()
-
-    # Risk scoring aligned to weighted suspicious action categories.
-    severity_map = {
-        # Face absence: No face detected > 5 sec
-        "no_face": 15,
-
-        # Eye/head movement: Looking away repeatedly
-        "gaze_left": 5,
-        "gaze_right": 5,
-
-        # Multiple persons: Multiple faces detected
-        "multiple_faces": 25,
-
-        # Camera tampering: Camera blocked/covered or denied
-        "permissions_blocked": 20,
-        "fullscreen_denied": 20,
-
-        # Tab switching: Leaving exam window
-        "tab_hidden": 15,
-
-        # External apps: Opening new software / moving focus outside exam
-        "window_blur": 20,
-        "fullscreen_exit": 20,
-
-        # Phone detection: Mobile phone visible
-        "phone_detected": 30,
-
-        # Notes detection: Book/paper seen (future/optional detectors)
-        "notes_detected": 25,
-        "book_detected": 25,
-        "paper_detected": 25,
-
-        # Audio anomaly: Background voice/noise
-        "audio_noise": 10,
-    }
-    risk_scores = {}
-    for user, vtype, count in violation_rows:
-        risk_scores[user] = risk_scores.get(user, 0) + severity_map.get(vtype, 1) * count
-
+    risk_scores = risk.student_scores(cur)
     conn.close()
 
     return render_template(
@@ -250,7 +233,7 @@ def admin_student_detail(username):
     if "user" not in session or session["role"] != "admin":
         return redirect("/admin-login")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
 
     cur.execute("""
@@ -305,7 +288,7 @@ def create_exam():
         session["message"] = "Exam code and title are required."
         return redirect("/admin-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     try:
         cur.execute(
@@ -314,7 +297,7 @@ def create_exam():
         )
         conn.commit()
         session["message"] = f"Exam {exam_code} created."
-    except sqlite3.IntegrityError:
+    except db.IntegrityError:
         session["message"] = f"Exam code {exam_code} already exists."
     finally:
         conn.close()
@@ -339,7 +322,7 @@ def add_question():
         session["message"] = "All question fields are required."
         return redirect("/admin-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT 1 FROM exams WHERE exam_code = ?", (exam_code,))
     exam_exists = cur.fetchone()
@@ -355,8 +338,10 @@ def add_question():
         """,
         (question, option1, option2, option3, option4, answer, exam_code),
     )
+    bump_question_version(cur, exam_code)
     conn.commit()
     conn.close()
+    question_cache.invalidate(exam_code)
 
     session["message"] = f"Question added to exam {exam_code}."
     return redirect("/admin-dashboard")
@@ -371,14 +356,14 @@ def upload_form():
     form_file = request.files.get("form_file")
 
     if not exam_code or not form_file:
-        session["message"] = "Exam code and CSV file are required."
+        session["message"] = "Exam code and a question file are required."
         return redirect("/admin-dashboard")
 
-    if not form_file.filename.lower().endswith(".csv"):
-        session["message"] = "Only CSV files are supported for form uploads."
+    if not form_file.filename.lower().endswith(SUPPORTED_EXTENSIONS):
+        session["message"] = "Only CSV, JSON Lines and XLSX files are supported for form uploads."
         return redirect("/admin-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT 1 FROM exams WHERE exam_code = ?", (exam_code,))
     exam_exists = cur.fetchone()
@@ -387,41 +372,116 @@ def upload_form():
         session["message"] = f"Exam code {exam_code} not found. Create the exam first."
         return redirect("/admin-dashboard")
 
-    decoded = form_file.stream.read().decode("utf-8").splitlines()
-    reader = csv.DictReader(decoded)
-    required_fields = {"question", "option1", "option2", "option3", "option4", "answer"}
-    if not required_fields.issubset(reader.fieldnames or set()):
+    try:
+        added, errors = import_questions(cur, form_file.stream, form_file.filename, exam_code)
+    except (ImportFormatError, UnicodeDecodeError) as exc:
         conn.close()
-        session["message"] = "CSV must include question, option1, option2, option3, option4, answer headers."
+        session["message"] = f"Could not read {form_file.filename}: {exc}"
         return redirect("/admin-dashboard")
 
-    added = 0
-    for row in reader:
-        if not row.get("question"):
-            continue
-        cur.execute(
-            """
-            INSERT INTO questions(question, option1, option2, option3, option4, answer, exam_code)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            """,
-            (
-                row.get("question", "").strip(),
-                row.get("option1", "").strip(),
-                row.get("option2", "").strip(),
-                row.get("option3", "").strip(),
-                row.get("option4", "").strip(),
-                row.get("answer", "").strip(),
-                exam_code,
-            ),
-        )
-        added += 1
-
+    bump_question_version(cur, exam_code)
     conn.commit()
     conn.close()
+    question_cache.invalidate(exam_code)
 
     session["message"] = f"Uploaded {added} questions to exam {exam_code}."
+    if errors:
+        session["message"] += f" Skipped {len(errors)} rows: {summarize_errors(errors)}"
     return redirect("/admin-dashboard")
 
+# ---------------- REPORTS ----------------
+@app.route("/admin/reports", methods=["GET"])
+def admin_reports():
+    if "user" not in session or session["role"] != "admin":
+        return redirect("/admin-login")
+
+    conn = db.connect("proctoring.db")
+    cur = conn.cursor()
+    cur.execute("SELECT exam_code, title FROM exams ORDER BY id DESC")
+    exams = cur.fetchall()
+    cur.execute("SELECT username FROM users WHERE role = 'student' ORDER BY username")
+    students = [row[0] for row in cur.fetchall()]
+    conn.close()
+
+    return render_template(
+        "report.html",
+        exams=exams,
+        students=students,
+        scope=request.args.get("scope", "student"),
+        name=request.args.get("name", ""),
+    )
+
+
+# Starts (or reuses) a background job; poll the returned id for progress.
+@app.route("/admin/reports", methods=["POST"])
+def create_report():
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    payload = request.get_json(silent=True) or request.form
+    scope = (payload.get("scope") or "").strip()
+    name = (payload.get("name") or "").strip()
+    if scope == "exam":
+        name = name.upper()
+    if not name:
+        return jsonify({"error": "name is required"}), 400
+
+    try:
+        status = report_jobs.submit(scope, name, app.static_folder)
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+    return jsonify(status), 202
+
+
+@app.route("/admin/reports/<report_id>", methods=["GET"])
+def report_status(report_id):
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    status = report_jobs.status(report_id)
+    if status is None:
+        return jsonify({"error": "Unknown report"}), 404
+    return jsonify(status)
+
+
+@app.route("/admin/reports/<report_id>/download", methods=["GET"])
+def download_report(report_id):
+    if "user" not in session or session["role"] != "admin":
+        return redirect("/admin-login")
+
+    path = report_jobs.path(report_id)
+    if path is None:
+        return jsonify({"error": "Report is not ready"}), 404
+    return send_file(path, mimetype="application/pdf", as_attachment=True, download_name=f"{report_id}.pdf")
+
+
+# ---------------- EXPORTS ----------------
+# Streams every matching row as CSV, JSON Lines or Parquet:
+# /admin/export/violations?format=parquet&exam_code=EX1&since=2024-01-01&until=2024-06-30
+@app.route("/admin/export/<dataset>", methods=["GET"])
+def admin_export(dataset):
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        chunks, mimetype, filename = exports.export(
+            dataset, request.args.get("format", "csv"), exports.parse_filters(request.args)
+        )
+    except ValueError as exc:
+        return jsonify({"error": str(exc)}), 400
+
+    # stream_with_context keeps the request (and its pooled connection) open
+    # until the last chunk is sent.
+    return Response(
+        stream_with_context(chunks),
+        mimetype=mimetype,
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "X-Accel-Buffering": "no",
+        },
+    )
+
+
 # ---------------- EXAM PAGE ----------------
 @app.route("/exam", methods=["GET", "POST"])
 def exam():
@@ -433,7 +493,7 @@ def exam():
         session["message"] = "Please search and select an exam before starting."
         return redirect("/student-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute(
         "SELECT 1 FROM exam_attempts WHERE user = ? AND exam_code = ? LIMIT 1",
@@ -448,18 +508,18 @@ def exam():
 
     # Load questions
     if request.method == "GET":
-        questions = get_exam_questions(exam_code)
-        if not questions:
+        bank = get_question_bank(exam_code)
+        if not bank.questions:
             session["message"] = f"No questions found for exam code {exam_code}."
             return redirect("/student-dashboard")
-        return render_template("exam.html", questions=questions)
+        return bank.page(lambda questions: render_template("exam.html", questions=questions))
 
     # Submit exam
     if request.method == "POST":
-        score = calculate_score(request.form)
+        score = calculate_score(request.form, exam_code)
 
         # Save attempt
-        conn = sqlite3.connect("proctoring.db")
+        conn = db.connect("proctoring.db")
         cur = conn.cursor()
         cur.execute(
             "INSERT INTO exam_attempts(user, score, exam_code) VALUES (?, ?, ?)",
@@ -481,7 +541,7 @@ def search_exam():
         session["message"] = "Please enter a valid exam code."
         return redirect("/student-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT exam_code, title, description FROM exams WHERE exam_code = ?", (exam_code,))
     exam = cur.fetchone()
@@ -507,7 +567,7 @@ def permissions_check():
         session["message"] = "Please search and select an exam before starting."
         return redirect("/student-dashboard")
 
-    conn = sqlite3.connect("proctoring.db")
+    conn = db.connect("proctoring.db")
     cur = conn.cursor()
     cur.execute("SELECT exam_code, title, description FROM exams WHERE exam_code = ?", (exam_code,))
     exam = cur.fetchone()
@@ -539,7 +599,7 @@ def start_exam():
 
     exam_code = session.get("selected_exam")
     if exam_code:
-        conn = sqlite3.connect("proctoring.db")
+        conn = db.connect("proctoring.db")
         cur = conn.cursor()
         cur.execute(
             "SELECT 1 FROM exam_attempts WHERE user = ? AND exam_code = ? LIMIT 1",
@@ -554,6 +614,21 @@ def start_exam():
     return redirect("/exam")
 
 
+def _analyze_response(image_bgr, enable_phone, motion=None):
+    if image_bgr is None:
+        return {"violations": [], "score": 0}, 400
+
+    session_id = f"{session['user']}:{session.get('selected_exam')}"
+    try:
+        violations, score = runtime.analyze(
+            image_bgr, enable_phone=enable_phone, session_id=session_id, motion=motion
+        )
+    except (TimeoutError, runtime.AnalyzerUnavailable):
+        return {"violations": [], "score": 0}, 503
+    return {"violations": violations, "score": score}
+
+
+# Compatibility path: base64 data URL inside a JSON body.
 @app.route("/proctor/analyze", methods=["POST"])
 def proctor_analyze():
     if "user" not in session or session["role"] != "student":
@@ -563,23 +638,134 @@ def proctor_analyze():
     if not payload or "image" not in payload:
         return {"violations": [], "score": 0}, 400
 
-    import numpy as np
-    import cv2
-    from proctor_ai.violation_engine import analyze_frame
-
     image_data = payload["image"].split(",")[-1]
-    decoded = base64.b64decode(image_data)
-    np_arr = np.frombuffer(decoded, np.uint8)
-    image_bgr = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+    with metrics.stage("base64_decode"):
+        jpeg = base64.b64decode(image_data)
+    image_bgr = runtime.decode_jpeg(jpeg)
+    enable_phone = bool(payload.get("enable_phone", True))
+    # Ignored when not a number, like request.args.get(type=float) on /frame.
+    try:
+        motion = float(payload["motion"]) if payload.get("motion") is not None else None
+    except (TypeError, ValueError):
+        motion = None
+    return _analyze_response(image_bgr, enable_phone, motion)
 
-    if image_bgr is None:
+
+# Raw JPEG bytes, either as the request body (application/octet-stream or
+# image/jpeg) or as the "frame" part of a multipart upload from canvas.toBlob.
+@app.route("/proctor/analyze/frame", methods=["POST"])
+def proctor_analyze_frame():
+    if "user" not in session or session["role"] != "student":
+        return {"violations": [], "score": 0}, 403
+
+    if request.mimetype == "multipart/form-data":
+        frame = request.files.get("frame")
+        if frame is None:
+            return {"violations": [], "score": 0}, 400
+        raw = frame.stream.read()
+        enable_phone = request.form.get("enable_phone", "1") != "0"
+    else:
+        raw = request.get_data(cache=False)
+        enable_phone = request.args.get("enable_phone", "1") != "0"
+
+    if not raw:
         return {"violations": [], "score": 0}, 400
+    motion = request.args.get("motion", type=float)
+    return _analyze_response(runtime.decode_jpeg(raw), enable_phone, motion)
 
-    enable_phone = bool(payload.get("enable_phone", True))
-    violations, score = analyze_frame(image_bgr, enable_phone=enable_phone)
-    return {"violations": violations, "score": score}
 
+@app.route("/api/admin/write-behind", methods=["GET"])
+def api_write_behind_stats():
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify({**writer.stats(), "dead_letters": writer.dead_letters()[-50:]})
+
+
+@app.route(S3_APP_PREFIX + "<path:key>", methods=["GET"])
+def snapshot_object(key):
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return redirect(get_storage(app.static_folder).object_url(key))
+
+
+@app.route("/api/admin/snapshots", methods=["GET"])
+def api_snapshot_stats():
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(snapshot_writer.stats())
+
+
+@app.route("/api/admin/presence", methods=["GET"])
+def api_admin_presence():
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    exam_code = (request.args.get("exam_code") or "").strip().upper() or None
+    try:
+        stale_after_s = int(request.args.get("stale_after", 30))
+    except ValueError:
+        return jsonify({"error": "stale_after must be an integer"}), 400
+
+    sessions = list_presence(exam_code, stale_after_s)
+    return jsonify(
+        {
+            "live": [row for row in sessions if row["status"] == "live"],
+            "stale": [row for row in sessions if row["status"] == "stale"],
+        }
+    )
+
+
+# Prometheus scrape target. Metrics are per process: scrape every worker, or
+# run a single worker per target.
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return metrics.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+# Sampling profiler for the worker that serves the request; see
+# proctor_ai/profiler.py. GET returns collapsed stacks for flame graphs.
+@app.route("/admin/profiler", methods=["GET", "POST"])
+def admin_profiler():
+    if "user" not in session or session.get("role") != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    if request.method == "GET":
+        return profiler.collapsed(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+    action = request.args.get("action", "start")
+    if action == "stop":
+        profiler.stop()
+    else:
+        try:
+            interval_ms = float(request.args.get("interval_ms", 0)) or None
+            duration_s = float(request.args.get("duration_s", 30))
+        except ValueError:
+            return jsonify({"error": "interval_ms and duration_s must be numbers"}), 400
+        profiler.start(interval_ms=interval_ms, duration_s=duration_s)
+    return jsonify(profiler.status())
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    return {"status": "ok"}
+
+
+# Load balancers should hold traffic until every detector reports ready.
+@app.route("/readyz", methods=["GET"])
+def readyz():
+    status = lifecycle.readiness()
+    return jsonify(status), 200 if status["ready"] else 503
+
+
+@app.route("/proctor/scheduler-stats", methods=["GET"])
+def proctor_scheduler_stats():
+    if "user" not in session or session["role"] != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
 
+    return jsonify(runtime.stats())
 
 
 @app.route("/proctor/heartbeat", methods=["POST"])
@@ -587,18 +773,7 @@ def proctor_heartbeat():
     if "user" not in session or session["role"] != "student":
         return {"status": "unauthorized"}, 403
 
-    conn = sqlite3.connect("proctoring.db")
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO proctor_health(user, exam_code, last_seen)
-        VALUES (?, ?, CURRENT_TIMESTAMP)
-        """,
-        (session["user"], session.get("selected_exam")),
-    )
-    conn.commit()
-    conn.close()
-
+    record_heartbeat(session["user"], session.get("selected_exam"))
     return {"status": "ok"}
 
 @app.route("/proctor/violation", methods=["POST"])
@@ -607,69 +782,13 @@ def proctor_violation():
         return {"status": "unauthorized"}, 403
 
     payload = request.get_json() or {}
-    violation_type = payload.get("type", "unknown")
-    screenshot_path = None
-
-    severe_types = {
-        "phone_detected",
-        "multiple_faces",
-        "no_face",
-        "permissions_blocked",
-        "fullscreen_exit",
-        "fullscreen_denied",
-        "tab_hidden",
-        "window_blur",
-        "notes_detected",
-        "book_detected",
-        "paper_detected",
-    }
-
-    screenshot_data = payload.get("screenshot")
-    if screenshot_data and violation_type in severe_types:
-        # Keep only one screenshot for phone_detected per user+exam.
-        if violation_type == "phone_detected":
-            conn = sqlite3.connect("proctoring.db")
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT 1
-                FROM violations
-                WHERE user = ? AND exam_code = ? AND type = 'phone_detected' AND screenshot_path IS NOT NULL
-                LIMIT 1
-                """,
-                (session["user"], session.get("selected_exam")),
-            )
-            phone_screenshot_exists = cur.fetchone() is not None
-            conn.close()
-            if phone_screenshot_exists:
-                screenshot_data = None
-
-        if screenshot_data:
-            try:
-                image_b64 = screenshot_data.split(",")[-1]
-                image_bytes = base64.b64decode(image_b64)
-                snaps_dir = os.path.join(app.static_folder, "violation_snaps")
-                os.makedirs(snaps_dir, exist_ok=True)
-                filename = f"{session['user']}_{uuid.uuid4().hex}.jpg"
-                file_path = os.path.join(snaps_dir, filename)
-                with open(file_path, "wb") as f:
-                    f.write(image_bytes)
-                screenshot_path = f"/static/violation_snaps/{filename}"
-            except Exception:
-                screenshot_path = None
-
-    conn = sqlite3.connect("proctoring.db")
-    cur = conn.cursor()
-    cur.execute(
-        """
-        INSERT INTO violations(user, exam_code, type, screenshot_path)
-        VALUES (?, ?, ?, ?)
-        """,
-        (session["user"], session.get("selected_exam"), violation_type, screenshot_path),
+    record_violation(
+        session["user"],
+        session.get("selected_exam"),
+        payload.get("type", "unknown"),
+        payload.get("screenshot"),
+        app.static_folder,
     )
-    conn.commit()
-    conn.close()
-
     return {"status": "ok"}
 
 if __name__ == "__main__":
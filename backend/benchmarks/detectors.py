@@ -0,0 +1,236 @@
+"""Micro-benchmark the proctor_ai detectors on fixed frame corpora.
+
+The corpus is built from the JPEGs in static/violation_snaps: every frame is
+labelled once by face count (0, 1, 2+) and resized to each resolution, so
+every run measures the same inputs. For each detector, resolution and face
+bucket the suite records ops/sec and latency percentiles, then re-runs a few
+calls one at a time for two memory figures:
+
+    net_retained_blocks_per_call  mean change in sys.getallocatedblocks()
+                                  across a call, with a full collection before
+                                  and after: blocks the call leaves behind
+                                  (caches, leaks). This is not an allocation
+                                  count; it is 0 for a call that frees all it
+                                  allocates and can be negative when a call
+                                  evicts cached objects.
+    alloc_peak_kb                 largest per-call peak of traced memory above
+                                  what was in use when the call started.
+
+tracemalloc sees Python and numpy allocations, not memory that MediaPipe,
+ONNX Runtime or torch allocate natively; RSS covers those.
+
+    python benchmarks/detectors.py --json detectors.json
+    python benchmarks/detectors.py --baseline detectors.json --fail-on-regression
+"""
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# One model instance per detector keeps the numbers comparable across machines.
+os.environ.setdefault("PROCTOR_MODEL_POOL_SIZE", "1")
+
+FIXTURES = os.path.join(BACKEND_DIR, "static", "violation_snaps", "*.jpg")
+RESOLUTIONS = ("320x240", "640x480", "1280x720")
+DETECTORS = ("count_faces", "estimate_gaze", "detect_phone", "analyze_frame")
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _detectors():
+    from proctor_ai import face_module, gaze_module, phone_module, violation_engine
+
+    return {
+        "count_faces": face_module.count_faces,
+        "estimate_gaze": gaze_module.estimate_gaze,
+        "detect_phone": phone_module.detect_phone,
+        "analyze_frame": violation_engine.analyze_frame,
+    }
+
+
+def _face_bucket(count):
+    return "2+" if count >= 2 else str(count)
+
+
+def build_corpus(resolutions, per_bucket):
+    import cv2
+    from proctor_ai.face_module import count_faces
+
+    images = [cv2.imread(path) for path in sorted(glob.glob(FIXTURES))]
+    images = [image for image in images if image is not None]
+    if not images:
+        raise SystemExit(f"no fixture frames found in {FIXTURES}")
+
+    buckets = {}
+    for image in images:
+        frames = buckets.setdefault(_face_bucket(count_faces(image)), [])
+        if len(frames) < per_bucket:
+            frames.append(image)
+
+    corpus = {}
+    for resolution in resolutions:
+        width, height = (int(value) for value in resolution.split("x"))
+        for bucket, frames in sorted(buckets.items()):
+            corpus[(resolution, bucket)] = [
+                cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA) for frame in frames
+            ]
+    return corpus
+
+
+def bench(fn, frames, min_time_s, min_calls, alloc_calls):
+    fn(frames[0])
+
+    latencies = []
+    started = time.perf_counter()
+    index = 0
+    while index < min_calls or time.perf_counter() - started < min_time_s:
+        frame = frames[index % len(frames)]
+        tick = time.perf_counter()
+        fn(frame)
+        latencies.append((time.perf_counter() - tick) * 1000.0)
+        index += 1
+    elapsed = time.perf_counter() - started
+
+    # See the module docstring for what the two memory figures mean.
+    # sys.getallocatedblocks() ignores tracemalloc's own bookkeeping, and the
+    # collections keep garbage from earlier calls out of the difference.
+    net_blocks = []
+    peaks = []
+    tracemalloc.start()
+    for call in range(alloc_calls):
+        frame = frames[call % len(frames)]
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        gc.collect()
+        blocks = sys.getallocatedblocks()
+        fn(frame)
+        peaks.append(tracemalloc.get_traced_memory()[1] - current)
+        gc.collect()
+        net_blocks.append(sys.getallocatedblocks() - blocks)
+    tracemalloc.stop()
+
+    return {
+        "calls": len(latencies),
+        "ops_per_s": len(latencies) / elapsed,
+        "latency_ms_p50": statistics.median(latencies),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "latency_ms_mean": statistics.fmean(latencies),
+        "net_retained_blocks_per_call": statistics.fmean(net_blocks),
+        "alloc_peak_kb": max(peaks) / 1024.0,
+        "rss_mb": _rss_mb(),
+    }
+
+
+def _meta():
+    import cv2
+    import numpy as np
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+        "phone_backend": os.getenv("PROCTOR_PHONE_BACKEND", "ultralytics"),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    previous = {(row["detector"], row["resolution"], row["faces"]): row for row in baseline["results"]}
+    regressions = []
+    print(f"\n{'detector':14} {'res':>9} {'faces':>5} {'ops/s':>9} {'base':>9} {'change':>8}")
+    for row in results:
+        old = previous.get((row["detector"], row["resolution"], row["faces"]))
+        if old is None:
+            continue
+        change = row["ops_per_s"] / old["ops_per_s"] - 1.0 if old["ops_per_s"] else 0.0
+        flag = ""
+        if change < -threshold:
+            flag = "  REGRESSION"
+            regressions.append(row)
+        print(
+            f"{row['detector']:14} {row['resolution']:>9} {row['faces']:>5} {row['ops_per_s']:9.1f} "
+            f"{old['ops_per_s']:9.1f} {change:+8.1%}{flag}"
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detectors", nargs="*", choices=DETECTORS, default=list(DETECTORS))
+    parser.add_argument("--resolutions", nargs="*", default=list(RESOLUTIONS))
+    parser.add_argument("--frames-per-bucket", type=int, default=8)
+    parser.add_argument("--min-time", type=float, default=2.0, help="seconds per measurement")
+    parser.add_argument("--min-calls", type=int, default=20)
+    parser.add_argument("--alloc-calls", type=int, default=5)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="ops/sec drop that counts as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    detectors = _detectors()
+    corpus = build_corpus(args.resolutions, args.frames_per_bucket)
+
+    results = []
+    print(f"{'detector':14} {'res':>9} {'faces':>5} {'frames':>6} {'ops/s':>9} {'p50 ms':>8} {'p95 ms':>8} "
+          f"{'retained':>8} {'peak KB':>9}")
+    for name in args.detectors:
+        for (resolution, faces), frames in sorted(corpus.items()):
+            row = {"detector": name, "resolution": resolution, "faces": faces, "frames": len(frames)}
+            row.update(bench(detectors[name], frames, args.min_time, args.min_calls, args.alloc_calls))
+            results.append(row)
+            print(
+                f"{name:14} {resolution:>9} {faces:>5} {len(frames):6d} {row['ops_per_s']:9.1f} "
+                f"{row['latency_ms_p50']:8.2f} {row['latency_ms_p95']:8.2f} "
+                f"{row['net_retained_blocks_per_call']:8.0f} {row['alloc_peak_kb']:9.1f}"
+            )
+
+    report = {"meta": _meta(), "results": results}
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle), args.threshold)
+        if regressions and args.fail_on_regression:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
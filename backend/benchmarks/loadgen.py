@@ -0,0 +1,320 @@
+"""Simulate concurrent examinees against a running app node.
+
+Each examinee registers (if needed), logs in through /api/auth/login, selects
+the exam and then behaves like proctor.js: it posts a frame, waits for the
+verdict, sleeps 450 ms and repeats, sends a heartbeat every 10 s and fires
+violations at a configurable rate. Frames and screenshots are the JPEGs in
+static/violation_snaps.
+
+    python benchmarks/loadgen.py --url http://127.0.0.1:5000 --students 50 \\
+        --duration 120 --exam-code LOAD1 --admin admin:admin123 \\
+        --server-pid $(pgrep -f gunicorn | tr '\\n' ',') --json load.json
+
+--admin creates the exam (with one question) when it does not exist yet.
+--server-pid samples CPU and RSS of the given local processes, so run the
+generator on the app node or leave it out for remote targets.
+"""
+import argparse
+import base64
+import glob
+import http.cookiejar
+import json
+import os
+import random
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+import uuid
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIXTURES = os.path.join(BACKEND_DIR, "static", "violation_snaps", "*.jpg")
+
+FRAME_INTERVAL_S = 0.45
+HEARTBEAT_INTERVAL_S = 10.0
+VIOLATION_TYPES = ("tab_hidden", "window_blur", "no_face", "phone_detected", "gaze_left")
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+class Client:
+    def __init__(self, base_url, timeout):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()),
+            _NoRedirect(),
+        )
+
+    def request(self, path, body=None, content_type=None):
+        headers = {"Content-Type": content_type} if content_type else {}
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers,
+                                     method="POST" if body is not None else "GET")
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as exc:
+            return exc.code, exc.read()
+
+    def post_json(self, path, payload):
+        return self.request(path, json.dumps(payload).encode(), "application/json")
+
+    def post_form(self, path, fields):
+        return self.request(path, urllib.parse.urlencode(fields).encode(), "application/x-www-form-urlencoded")
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Form routes answer with redirects; the status is all the generator needs.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.statuses = {}
+
+    def record(self, kind, status, seconds):
+        with self._lock:
+            self.latencies.setdefault(kind, []).append(seconds * 1000.0)
+            self.statuses.setdefault(kind, {}).setdefault(status, 0)
+            self.statuses[kind][status] += 1
+            if status >= 400 or status == 0:
+                self.errors[kind] = self.errors.get(kind, 0) + 1
+
+    def reset(self, keep=()):
+        with self._lock:
+            for table in (self.latencies, self.errors, self.statuses):
+                for kind in [kind for kind in table if kind not in keep]:
+                    del table[kind]
+
+
+def _timed(recorder, kind, call):
+    started = time.perf_counter()
+    try:
+        status, body = call()
+    except OSError:
+        status, body = 0, b""
+    recorder.record(kind, status, time.perf_counter() - started)
+    return status, body
+
+
+def examinee(index, args, frames, recorder, stop, ready):
+    client = Client(args.url, args.timeout)
+    username = f"{args.user_prefix}{index:04d}"
+
+    client.post_form("/register", {"username": username, "password": args.password})
+    status, _ = _timed(recorder, "login", lambda: client.post_json(
+        "/api/auth/login", {"username": username, "password": args.password, "role": "student"}))
+    if status == 200:
+        status, _ = client.post_json("/api/student/search-exam", {"exam_code": args.exam_code})
+    ready.wait()
+    if status != 200:
+        recorder.record("setup_failed", status, 0.0)
+        return
+
+    rng = random.Random(index)
+    frame_index = rng.randrange(len(frames))
+    next_heartbeat = time.monotonic()
+    violation_rate_s = args.violations_per_min / 60.0
+
+    while not stop.is_set():
+        frame = frames[frame_index % len(frames)]
+        frame_index += 1
+        if args.endpoint == "frame":
+            _timed(recorder, "analyze", lambda: client.request(
+                "/proctor/analyze/frame?enable_phone=1", frame, "image/jpeg"))
+        else:
+            _timed(recorder, "analyze", lambda: client.post_json(
+                "/proctor/analyze",
+                {"image": "data:image/jpeg;base64," + base64.b64encode(frame).decode(), "enable_phone": True}))
+
+        now = time.monotonic()
+        if now >= next_heartbeat:
+            _timed(recorder, "heartbeat", lambda: client.request("/proctor/heartbeat", b""))
+            next_heartbeat = now + HEARTBEAT_INTERVAL_S
+
+        if violation_rate_s and rng.random() < violation_rate_s * FRAME_INTERVAL_S:
+            screenshot = "data:image/jpeg;base64," + base64.b64encode(rng.choice(frames)).decode()
+            _timed(recorder, "violation", lambda: client.post_json(
+                "/proctor/violation", {"type": rng.choice(VIOLATION_TYPES), "screenshot": screenshot}))
+
+        # proctor.js schedules the next frame 450 ms after the verdict arrives.
+        stop.wait(FRAME_INTERVAL_S)
+
+
+def ensure_exam(args):
+    username, _, password = args.admin.partition(":")
+    client = Client(args.url, args.timeout)
+    status, _ = client.post_form("/admin-login", {"username": username, "password": password})
+    if status >= 400:
+        raise SystemExit(f"admin login failed with HTTP {status}")
+    client.post_form("/admin/exams", {"exam_code": args.exam_code, "title": "Load test", "description": "loadgen"})
+    client.post_form("/admin/questions", {
+        "exam_code": args.exam_code, "question": "Load test question?",
+        "option1": "a", "option2": "b", "option3": "c", "option4": "d", "answer": "a",
+    })
+
+
+class ProcessSampler:
+    # CPU seconds and RSS of local server processes, read from /proc.
+    def __init__(self, pids, interval_s=1.0):
+        self.pids = pids
+        self.interval_s = interval_s
+        self.rss_mb = []
+        self._cpu_start = None
+        self._cpu_end = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def _cpu_seconds(pid):
+        with open(f"/proc/{pid}/stat") as handle:
+            fields = handle.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+    @staticmethod
+    def _rss(pid):
+        with open(f"/proc/{pid}/status") as handle:
+            for line in handle:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+        return 0.0
+
+    def _total(self, read):
+        total = 0.0
+        for pid in self.pids:
+            try:
+                total += read(pid)
+            except (OSError, ValueError, IndexError):
+                pass
+        return total
+
+    def _run(self):
+        while not self._stop.wait(self.interval_s):
+            self.rss_mb.append(self._total(self._rss))
+
+    def start(self):
+        self._cpu_start = (time.monotonic(), self._total(self._cpu_seconds))
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self._cpu_end = (time.monotonic(), self._total(self._cpu_seconds))
+
+    def summary(self):
+        wall = self._cpu_end[0] - self._cpu_start[0]
+        cpu = self._cpu_end[1] - self._cpu_start[1]
+        return {
+            "pids": self.pids,
+            "cpu_cores_avg": cpu / wall if wall else 0.0,
+            "rss_mb_max": max(self.rss_mb, default=0.0),
+            "rss_mb_avg": statistics.fmean(self.rss_mb) if self.rss_mb else 0.0,
+        }
+
+
+def summarize(recorder, elapsed):
+    results = {}
+    for kind, latencies in sorted(recorder.latencies.items()):
+        results[kind] = {
+            "requests": len(latencies),
+            "errors": recorder.errors.get(kind, 0),
+            "per_s": len(latencies) / elapsed if elapsed else 0.0,
+            "latency_ms_p50": _percentile(latencies, 50),
+            "latency_ms_p95": _percentile(latencies, 95),
+            "latency_ms_p99": _percentile(latencies, 99),
+            "statuses": {str(code): count for code, count in recorder.statuses[kind].items()},
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--students", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds of steady load")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="seconds over which examinees start")
+    parser.add_argument("--exam-code", default="LOADTEST")
+    parser.add_argument("--endpoint", choices=("frame", "json"), default="frame",
+                        help="raw JPEG to /proctor/analyze/frame or base64 JSON to /proctor/analyze")
+    parser.add_argument("--violations-per-min", type=float, default=2.0)
+    parser.add_argument("--user-prefix", default=f"load_{uuid.uuid4().hex[:6]}_")
+    parser.add_argument("--password", default="loadtest")
+    parser.add_argument("--admin", help="admin:password, creates the exam if needed")
+    parser.add_argument("--server-pid", default="", help="comma separated local server pids to sample")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    frames = [open(path, "rb").read() for path in sorted(glob.glob(FIXTURES))]
+    if not frames:
+        raise SystemExit(f"no fixture frames found in {FIXTURES}")
+
+    if args.admin:
+        ensure_exam(args)
+
+    recorder = Recorder()
+    stop = threading.Event()
+    ready = threading.Event()
+    threads = []
+    for index in range(args.students):
+        thread = threading.Thread(target=examinee, args=(index, args, frames, recorder, stop, ready), daemon=True)
+        thread.start()
+        threads.append(thread)
+        if args.ramp_up and args.students > 1:
+            time.sleep(args.ramp_up / args.students)
+    ready.set()
+
+    pids = [int(pid) for pid in args.server_pid.split(",") if pid.strip()]
+    sampler = ProcessSampler(pids) if pids else None
+    if sampler:
+        sampler.start()
+
+    # Steady-state numbers only: drop frames recorded while others were logging in.
+    recorder.reset(keep=("login", "setup_failed"))
+    started = time.monotonic()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=args.timeout)
+    elapsed = time.monotonic() - started
+    if sampler:
+        sampler.stop()
+
+    results = {
+        "url": args.url,
+        "students": args.students,
+        "endpoint": args.endpoint,
+        "duration_s": elapsed,
+        "requests": summarize(recorder, elapsed),
+    }
+    if sampler:
+        results["server"] = sampler.summary()
+
+    print(f"{args.students} examinees for {elapsed:.1f}s against {args.url} ({args.endpoint})")
+    print(f"{'kind':12} {'reqs':>7} {'err':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for kind, row in results["requests"].items():
+        print(
+            f"{kind:12} {row['requests']:7d} {row['errors']:5d} {row['per_s']:8.2f} "
+            f"{row['latency_ms_p50']:8.1f} {row['latency_ms_p95']:8.1f} {row['latency_ms_p99']:8.1f}"
+        )
+    if sampler:
+        server = results["server"]
+        print(f"server: {server['cpu_cores_avg']:.2f} cores avg, RSS max {server['rss_mb_max']:.0f} MB")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""Compare phone detector backends on latency, memory and cold start.
+
+Each backend runs in a fresh interpreter so import cost and RSS are measured
+from a clean process:
+
+    python benchmarks/phone_backends.py ultralytics onnx:yolov8n.onnx \\
+        onnx:yolov8n_int8.onnx --frames 200 --json phone_backends.json
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+FIXTURES = os.path.join(BACKEND_DIR, "static", "violation_snaps", "*.jpg")
+
+
+def _rss_mb():
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def _percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def run_child(spec, frames, imgsz, conf):
+    started = time.perf_counter()
+    rss_start = _rss_mb()
+
+    import cv2
+    from proctor_ai.phone_backends import create_backend
+
+    name, _, model_path = spec.partition(":")
+    backend = create_backend(name, model_path or None)
+
+    images = [cv2.imread(path) for path in sorted(glob.glob(FIXTURES))]
+    images = [image for image in images if image is not None]
+    if not images:
+        raise SystemExit(f"no fixture frames found in {FIXTURES}")
+
+    backend.detect([images[0]], imgsz, conf)
+    cold_start = time.perf_counter() - started
+
+    latencies = []
+    detections = []
+    for index in range(frames):
+        image = images[index % len(images)]
+        tick = time.perf_counter()
+        hit = backend.detect([image], imgsz, conf)[0]
+        latencies.append((time.perf_counter() - tick) * 1000.0)
+        if index < len(images):
+            detections.append(hit)
+
+    return {
+        "backend": spec,
+        "cold_start_s": cold_start,
+        "rss_mb": _rss_mb(),
+        "rss_start_mb": rss_start,
+        "latency_ms_p50": statistics.median(latencies),
+        "latency_ms_p95": _percentile(latencies, 95),
+        "latency_ms_mean": statistics.fmean(latencies),
+        "detections": detections,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("backends", nargs="*", default=["ultralytics", "onnx:yolov8n.onnx"],
+                        help="backend[:model_path], the first one is the reference for parity")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--conf", type=float, default=0.2)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child, args.frames, args.imgsz, args.conf)))
+        return
+
+    results = []
+    for spec in args.backends:
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", spec, "--frames", str(args.frames),
+             "--imgsz", str(args.imgsz), "--conf", str(args.conf)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    reference = results[0]["detections"]
+    print(f"{'backend':32} {'cold s':>8} {'RSS MB':>8} {'p50 ms':>8} {'p95 ms':>8} {'parity':>8}")
+    for result in results:
+        same = sum(a == b for a, b in zip(reference, result["detections"]))
+        result["parity"] = same / len(reference) if reference else 1.0
+        print(
+            f"{result['backend']:32} {result['cold_start_s']:8.2f} {result['rss_mb']:8.1f} "
+            f"{result['latency_ms_p50']:8.2f} {result['latency_ms_p95']:8.2f} {result['parity']:8.1%}"
+        )
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+
+if __name__ == "__main__":
+    main()
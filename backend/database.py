@@ -1,20 +1,48 @@
+import atexit
 import os
 import re
 import sqlite3
+import threading
 from typing import Any, Iterable, Optional
 
 try:
     import psycopg2
+    import psycopg2.extras
+    import psycopg2.pool
     from psycopg2 import IntegrityError as PgIntegrityError
+    from psycopg2 import OperationalError as PgOperationalError
 except Exception:  # pragma: no cover - optional dependency at runtime
     psycopg2 = None
     PgIntegrityError = Exception
+    PgOperationalError = Exception
 
 DB_NAME = "proctoring.db"
 SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
 USE_SUPABASE = bool(SUPABASE_DB_URL)
 
 IntegrityError = PgIntegrityError if USE_SUPABASE else sqlite3.IntegrityError
+# Locked database, lost connection and the like: worth retrying later.
+OperationalError = PgOperationalError if USE_SUPABASE else sqlite3.OperationalError
+
+PG_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+PG_POOL_MAX = int(os.getenv("DB_POOL_MAX", "10"))
+PG_POOL_TIMEOUT_S = float(os.getenv("DB_POOL_TIMEOUT_S", "30"))
+EXECUTE_BATCH_PAGE_SIZE = 500
+# Rows a server-side cursor pulls from Postgres per network round trip.
+STREAM_ITERSIZE = 2000
+
+# Applied once per pooled SQLite connection. WAL lets readers run alongside the
+# single writer; NORMAL sync is durable across application crashes in WAL mode.
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA temp_store=MEMORY",
+)
+
+# Postgres reserves "user"; the SQLite-era queries use it as a bare column name.
+_PG_USER_COLUMN = re.compile(r'(?<![\w"])user(?![\w"])')
 
 
 class CompatCursor:
@@ -25,6 +53,7 @@ class CompatCursor:
     def _adapt(self, query: str) -> str:
         if not self._use_postgres:
             return query
+        query = _PG_USER_COLUMN.sub('"user"', query)
         return re.sub(r"\?", "%s", query)
 
     def execute(self, query: str, params: Optional[Iterable[Any]] = None):
@@ -35,59 +64,231 @@ class CompatCursor:
             self._cursor.execute(sql, tuple(params))
         return self
 
+    def executemany(self, query: str, seq_of_params: Iterable[Iterable[Any]]):
+        params = [tuple(row) for row in seq_of_params]
+        if self._use_postgres:
+            # psycopg2's executemany is one round trip per row; batch them.
+            psycopg2.extras.execute_batch(self._cursor, self._adapt(query), params, page_size=EXECUTE_BATCH_PAGE_SIZE)
+        else:
+            self._cursor.executemany(self._adapt(query), params)
+        return self
+
     def fetchone(self):
         return self._cursor.fetchone()
 
     def fetchall(self):
         return self._cursor.fetchall()
 
+    def fetchmany(self, size: int):
+        return self._cursor.fetchmany(size)
+
+    def close(self):
+        self._cursor.close()
+
+    @property
+    def rowcount(self):
+        return self._cursor.rowcount
+
 
 class CompatConnection:
-    def __init__(self, conn, use_postgres: bool):
+    def __init__(self, conn, use_postgres: bool, release=None):
         self._conn = conn
         self._use_postgres = use_postgres
+        self._release = release
 
-    def cursor(self):
+    def cursor(self, name: Optional[str] = None):
+        # A named cursor is server-side on Postgres: rows stay on the server
+        # until fetched, so fetchmany() reads a large result in bounded memory.
+        # SQLite cursors already step through results lazily and ignore it.
+        if name and self._use_postgres:
+            cursor = self._conn.cursor(name=name)
+            cursor.itersize = STREAM_ITERSIZE
+            return CompatCursor(cursor, True)
         return CompatCursor(self._conn.cursor(), self._use_postgres)
 
     def commit(self):
         self._conn.commit()
 
+    def rollback(self):
+        self._conn.rollback()
+
     def close(self):
-        self._conn.close()
+        # Pooled connections go back to their pool; anything not committed is
+        # rolled back first so the next borrower starts clean.
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        if self._release is None:
+            conn.close()
+        else:
+            self._release(conn)
+
+
+_local = threading.local()
+
+
+def _open_sqlite(db_name: str):
+    conn = sqlite3.connect(db_name, timeout=30)
+    for pragma in SQLITE_PRAGMAS:
+        conn.execute(pragma)
+    return conn
+
+
+def _connect_sqlite(db_name: str) -> CompatConnection:
+    # One long-lived connection per thread and database file. A nested
+    # connect() on the same thread gets a private connection instead, so an
+    # inner close() cannot roll back the outer caller's transaction.
+    pooled = getattr(_local, "sqlite", None)
+    if pooled is None:
+        pooled = _local.sqlite = {}
+    entry = pooled.get(db_name)
+    if entry is None:
+        entry = pooled[db_name] = {"conn": _open_sqlite(db_name), "busy": False, "checkout": 0}
+    if entry["busy"]:
+        return CompatConnection(_open_sqlite(db_name), False)
+
+    entry["busy"] = True
+    entry["checkout"] += 1
+    checkout = entry["checkout"]
+
+    def release(conn):
+        # Ignore a late close() after release_thread_connections() reclaimed it.
+        if entry["checkout"] != checkout or not entry["busy"]:
+            return
+        if conn.in_transaction:
+            conn.rollback()
+        entry["busy"] = False
+
+    return CompatConnection(entry["conn"], False, release)
+
+
+def release_thread_connections():
+    # Called at the end of each request so a handler that raised (or returned
+    # early) without close() does not pin this thread's connection or hold on
+    # to a Postgres pool slot.
+    for entry in getattr(_local, "sqlite", {}).values():
+        if entry["busy"]:
+            if entry["conn"].in_transaction:
+                entry["conn"].rollback()
+            entry["busy"] = False
+    for release in list(getattr(_local, "pg", {}).values()):
+        release()
+
+
+_pg_pool = None
+_pg_pool_lock = threading.Lock()
+_pg_slots = threading.BoundedSemaphore(PG_POOL_MAX)
+
+
+def _get_pg_pool():
+    global _pg_pool
+    if _pg_pool is None:
+        with _pg_pool_lock:
+            if _pg_pool is None:
+                _pg_pool = psycopg2.pool.ThreadedConnectionPool(PG_POOL_MIN, PG_POOL_MAX, SUPABASE_DB_URL)
+    return _pg_pool
+
+
+def _connect_postgres() -> CompatConnection:
+    pool = _get_pg_pool()
+    # ThreadedConnectionPool raises when exhausted; wait for a slot instead.
+    if not _pg_slots.acquire(timeout=PG_POOL_TIMEOUT_S):
+        raise RuntimeError("Timed out waiting for a database connection")
+    try:
+        conn = pool.getconn()
+    except Exception:
+        _pg_slots.release()
+        raise
+
+    checked_out = getattr(_local, "pg", None)
+    if checked_out is None:
+        checked_out = _local.pg = {}
+
+    def release(raw=conn):
+        # Runs once, from close() or from release_thread_connections().
+        if checked_out.pop(id(raw), None) is None:
+            return
+        try:
+            if raw.closed:
+                pool.putconn(raw, close=True)
+            else:
+                raw.rollback()
+                pool.putconn(raw)
+        except Exception:
+            pool.putconn(raw, close=True)
+        finally:
+            _pg_slots.release()
+
+    checked_out[id(conn)] = release
+    return CompatConnection(conn, True, release)
 
 
 def connect(db_name: str = DB_NAME):
     if USE_SUPABASE:
         if psycopg2 is None:
             raise RuntimeError("SUPABASE_DB_URL set but psycopg2 is not installed")
-        return CompatConnection(psycopg2.connect(SUPABASE_DB_URL), True)
-    return CompatConnection(sqlite3.connect(db_name), False)
+        return _connect_postgres()
+    return _connect_sqlite(db_name)
+
+
+def close_pool():
+    global _pg_pool
+    if _pg_pool is not None:
+        _pg_pool.closeall()
+        _pg_pool = None
+
+
+atexit.register(close_pool)
 
 
 def get_db():
     return connect()
 
 
-def init_db():
-    conn = get_db()
-    cur = conn.cursor()
+# ---------------------------------------------------------------------------
+# Schema migrations
+#
+# Each migration runs once per database, in version order, inside its own
+# transaction, and is recorded in schema_migrations. The DDL is written once
+# for both backends: {pk} and {ts} expand to the backend's id and timestamp
+# types, and CompatCursor quotes the bare "user" column on Postgres. Append new
+# migrations to MIGRATIONS; never edit one that has shipped.
+# ---------------------------------------------------------------------------
 
+
+def _ddl(sql: str) -> str:
     if USE_SUPABASE:
-        cur.execute(
+        return sql.format(pk="BIGSERIAL PRIMARY KEY", ts="TIMESTAMP")
+    return sql.format(pk="INTEGER PRIMARY KEY AUTOINCREMENT", ts="DATETIME")
+
+
+def _add_column(cur, table: str, column: str, definition: str):
+    if USE_SUPABASE:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition}")
+        return
+    cur.execute(f"PRAGMA table_info({table})")
+    if column not in {row[1] for row in cur.fetchall()}:
+        cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+def _migrate_initial_schema(cur):
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS users (
-                id BIGSERIAL PRIMARY KEY,
+                id {pk},
                 username TEXT UNIQUE,
                 password TEXT,
                 role TEXT DEFAULT 'student'
             )
             """
         )
-        cur.execute(
+    )
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS questions (
-                id BIGSERIAL PRIMARY KEY,
+                id {pk},
                 question TEXT,
                 option1 TEXT,
                 option2 TEXT,
@@ -98,140 +299,238 @@ def init_db():
             )
             """
         )
-        cur.execute(
+    )
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS exam_attempts (
-                id BIGSERIAL PRIMARY KEY,
-                "user" TEXT,
+                id {pk},
+                user TEXT,
                 score INTEGER,
                 exam_code TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                timestamp {ts} DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
-        cur.execute(
+    )
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS violations (
-                id BIGSERIAL PRIMARY KEY,
-                "user" TEXT,
+                id {pk},
+                user TEXT,
                 exam_code TEXT,
                 type TEXT,
                 screenshot_path TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                timestamp {ts} DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
-        cur.execute(
+    )
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS exams (
-                id BIGSERIAL PRIMARY KEY,
+                id {pk},
                 exam_code TEXT UNIQUE,
                 title TEXT,
                 description TEXT
             )
             """
         )
-        cur.execute(
+    )
+    cur.execute(
+        _ddl(
             """
             CREATE TABLE IF NOT EXISTS proctor_health (
-                id BIGSERIAL PRIMARY KEY,
-                "user" TEXT,
+                id {pk},
+                user TEXT,
                 exam_code TEXT,
-                last_seen TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-            """
-        )
-    else:
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE,
-                password TEXT,
-                role TEXT DEFAULT 'student'
+                last_seen {ts} DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
+    )
+
+
+def _migrate_exam_code_columns(cur):
+    # Databases created before exams were scoped by exam_code.
+    _add_column(cur, "questions", "exam_code", "TEXT DEFAULT 'DEFAULT'")
+    _add_column(cur, "exam_attempts", "exam_code", "TEXT")
+    _add_column(cur, "violations", "exam_code", "TEXT")
+    _add_column(cur, "violations", "screenshot_path", "TEXT")
+
 
-        cur.execute(
+def _migrate_presence(cur):
+    cur.execute(
+        _ddl(
             """
-            CREATE TABLE IF NOT EXISTS questions (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                question TEXT,
-                option1 TEXT,
-                option2 TEXT,
-                option3 TEXT,
-                option4 TEXT,
-                answer TEXT,
-                exam_code TEXT DEFAULT 'DEFAULT'
+            CREATE TABLE IF NOT EXISTS proctor_presence (
+                user TEXT NOT NULL,
+                exam_code TEXT NOT NULL,
+                first_seen {ts},
+                last_seen {ts},
+                heartbeats INTEGER DEFAULT 0,
+                PRIMARY KEY (user, exam_code)
             )
             """
         )
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_presence_exam_last_seen ON proctor_presence(exam_code, last_seen)"
+    )
+
+
+def _migrate_query_indexes(cur):
+    # violations: dashboard/detail filter on user, the phone screenshot dedup
+    # on (user, exam_code, type); the detail page orders by timestamp.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_violations_user_exam_type ON violations(user, exam_code, type)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_violations_user_timestamp ON violations(user, timestamp)")
+    # exam_attempts: per-student history and the "already attempted" check.
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attempts_user_exam ON exam_attempts(user, exam_code)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_questions_exam_code ON questions(exam_code)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_health_last_seen ON proctor_health(last_seen)")
 
-        cur.execute(
+
+def _migrate_risk_scores(cur):
+    cur.execute(
+        _ddl(
             """
-            CREATE TABLE IF NOT EXISTS exam_attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user TEXT,
-                score INTEGER,
-                exam_code TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS risk_scores (
+                user TEXT NOT NULL,
+                exam_code TEXT NOT NULL,
+                score INTEGER DEFAULT 0,
+                violations INTEGER DEFAULT 0,
+                updated_at {ts},
+                PRIMARY KEY (user, exam_code)
             )
             """
         )
+    )
+    # Backfill from the violations already recorded.
+    from risk import rebuild
+
+    rebuild(cur)
+
 
-        cur.execute(
+def _migrate_question_version(cur):
+    # Bumped whenever an exam's questions change; keys the question-bank cache.
+    _add_column(cur, "exams", "question_version", "INTEGER DEFAULT 0")
+
+
+def _migrate_question_scoring(cur):
+    _add_column(cur, "questions", "weight", "REAL DEFAULT 1")
+    _add_column(cur, "questions", "partial_credit", "TEXT")
+
+
+def _migrate_snapshots(cur):
+    cur.execute(
+        _ddl(
             """
-            CREATE TABLE IF NOT EXISTS violations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
+            CREATE TABLE IF NOT EXISTS snapshots (
+                id {pk},
+                sha256 TEXT NOT NULL,
+                phash TEXT,
+                path TEXT,
                 user TEXT,
                 exam_code TEXT,
-                type TEXT,
-                screenshot_path TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+                bytes INTEGER,
+                width INTEGER,
+                height INTEGER,
+                created_at {ts}
             )
             """
         )
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_user_exam ON snapshots(user, exam_code)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_snapshots_sha256 ON snapshots(sha256)")
 
-        cur.execute(
-            """
-            CREATE TABLE IF NOT EXISTS exams (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                exam_code TEXT UNIQUE,
-                title TEXT,
-                description TEXT
-            )
-            """
-        )
 
-        cur.execute(
+def _migrate_export_indexes(cur):
+    # Exports filter by exam and/or date and stream in timestamp order; these
+    # let both backends walk an index instead of sorting the whole result.
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_violations_exam_timestamp ON violations(exam_code, timestamp)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations(timestamp)")
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_attempts_exam_timestamp ON exam_attempts(exam_code, timestamp)"
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_attempts_timestamp ON exam_attempts(timestamp)")
+
+
+def _migrate_attempt_score_real(cur):
+    # Weighted and partial-credit scores are fractional. SQLite's INTEGER
+    # affinity already stores non-integral values as REAL; Postgres would
+    # round them into the integer column.
+    if USE_SUPABASE:
+        cur.execute("ALTER TABLE exam_attempts ALTER COLUMN score TYPE DOUBLE PRECISION")
+
+
+MIGRATIONS = (
+    (1, "initial schema", _migrate_initial_schema),
+    (2, "exam_code and screenshot_path columns", _migrate_exam_code_columns),
+    (3, "proctor_presence", _migrate_presence),
+    (4, "query indexes", _migrate_query_indexes),
+    (5, "risk_scores aggregate", _migrate_risk_scores),
+    (6, "exams.question_version", _migrate_question_version),
+    (7, "question weights and partial credit", _migrate_question_scoring),
+    (8, "snapshots", _migrate_snapshots),
+    (9, "export indexes", _migrate_export_indexes),
+    (10, "fractional attempt scores", _migrate_attempt_score_real),
+)
+
+
+def _applied_versions(cur):
+    cur.execute(
+        _ddl(
             """
-            CREATE TABLE IF NOT EXISTS proctor_health (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user TEXT,
-                exam_code TEXT,
-                last_seen DATETIME DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                name TEXT,
+                applied_at {ts} DEFAULT CURRENT_TIMESTAMP
             )
             """
         )
+    )
+    cur.execute("SELECT version FROM schema_migrations")
+    return {row[0] for row in cur.fetchall()}
 
-        # SQLite-only lightweight migrations for existing databases
-        cur.execute("PRAGMA table_info(questions)")
-        question_columns = {row[1] for row in cur.fetchall()}
-        if "exam_code" not in question_columns:
-            cur.execute("ALTER TABLE questions ADD COLUMN exam_code TEXT DEFAULT 'DEFAULT'")
 
-        cur.execute("PRAGMA table_info(exam_attempts)")
-        attempt_columns = {row[1] for row in cur.fetchall()}
-        if "exam_code" not in attempt_columns:
-            cur.execute("ALTER TABLE exam_attempts ADD COLUMN exam_code TEXT")
+def migrate(conn):
+    cur = conn.cursor()
+    applied = _applied_versions(cur)
+    conn.commit()
+
+    for version, name, apply in MIGRATIONS:
+        if version in applied:
+            continue
+        try:
+            apply(cur)
+            cur.execute("INSERT INTO schema_migrations(version, name) VALUES (?, ?)", (version, name))
+            conn.commit()
+        except IntegrityError:
+            # Another process applied this version first.
+            conn.rollback()
+        except Exception:
+            conn.rollback()
+            raise
 
-        cur.execute("PRAGMA table_info(violations)")
-        violation_columns = {row[1] for row in cur.fetchall()}
-        if "exam_code" not in violation_columns:
-            cur.execute("ALTER TABLE violations ADD COLUMN exam_code TEXT")
-        if "screenshot_path" not in violation_columns:
-            cur.execute("ALTER TABLE violations ADD COLUMN screenshot_path TEXT")
 
+def schema_version():
+    conn = get_db()
+    cur = conn.cursor()
+    version = max(_applied_versions(cur), default=0)
     conn.commit()
     conn.close()
+    return version
+
+
+def init_db():
+    conn = get_db()
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
@@ -1,34 +1,223 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
 import database as db
 
 DB = "proctoring.db"
 
+# Question banks are cached per exam_code and reused until the exam's
+# question_version changes. Edits made through this process invalidate the
+# entry immediately; other worker processes notice the bumped version on their
+# next recheck.
+QUESTION_CACHE_SIZE = int(os.getenv("PROCTOR_QUESTION_CACHE_SIZE", "64"))
+QUESTION_CACHE_RECHECK_S = float(os.getenv("PROCTOR_QUESTION_CACHE_RECHECK_S", "5"))
+PRERENDER_EXAM_PAGE = os.getenv("PROCTOR_PRERENDER_EXAM_PAGE", "1") == "1"
+
+# Same order as the table so templates keep indexing q[0]..q[5]; scoring
+# columns come last.
+_QUESTION_COLUMNS = "id, question, option1, option2, option3, option4, answer, exam_code, weight, partial_credit"
+
+
+class QuestionBank:
+    def __init__(self, exam_code, version, questions):
+        self.exam_code = exam_code
+        self.version = version
+        self.questions = questions
+        self.checked_at = time.monotonic()
+        self._page = None
+        self._answer_key = None
+        self._lock = threading.Lock()
+
+    @property
+    def answer_key(self):
+        if self._answer_key is None:
+            self._answer_key = _answer_key(self.questions)
+        return self._answer_key
+
+    def page(self, render):
+        # The exam page depends only on the questions, so it is rendered once
+        # per version and shared by every student taking the exam.
+        if not PRERENDER_EXAM_PAGE:
+            return render(self.questions)
+        with self._lock:
+            if self._page is None:
+                self._page = render(self.questions)
+            return self._page
+
+
+class QuestionBankCache:
+    def __init__(self, max_size=QUESTION_CACHE_SIZE, recheck_s=QUESTION_CACHE_RECHECK_S):
+        self.max_size = max_size
+        self.recheck_s = recheck_s
+        self._banks = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "rechecks": 0, "evictions": 0}
+
+    def get(self, exam_code):
+        with self._lock:
+            bank = self._banks.get(exam_code)
+            if bank is not None:
+                self._banks.move_to_end(exam_code)
+
+        if bank is not None and time.monotonic() - bank.checked_at < self.recheck_s:
+            self._count("hits")
+            return bank
+
+        conn = db.connect(DB)
+        try:
+            cur = conn.cursor()
+            version = _question_version(cur, exam_code)
+            if bank is not None and bank.version == version:
+                bank.checked_at = time.monotonic()
+                self._count("rechecks")
+                return bank
+
+            cur.execute(f"SELECT {_QUESTION_COLUMNS} FROM questions WHERE exam_code = ? ORDER BY id", (exam_code,))
+            bank = QuestionBank(exam_code, version, cur.fetchall())
+        finally:
+            conn.close()
+
+        self._count("misses")
+        with self._lock:
+            self._banks[exam_code] = bank
+            self._banks.move_to_end(exam_code)
+            while len(self._banks) > self.max_size:
+                self._banks.popitem(last=False)
+                self._stats["evictions"] += 1
+        return bank
+
+    def invalidate(self, exam_code=None):
+        with self._lock:
+            if exam_code is None:
+                self._banks.clear()
+            else:
+                self._banks.pop(exam_code, None)
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        with self._lock:
+            data = dict(self._stats)
+            data["size"] = len(self._banks)
+        data["max_size"] = self.max_size
+        return data
+
+
+def _question_version(cur, exam_code):
+    cur.execute("SELECT question_version FROM exams WHERE exam_code = ?", (exam_code,))
+    row = cur.fetchone()
+    return row[0] if row else 0
+
+
+question_cache = QuestionBankCache()
+
+
+# Call inside the transaction that changes an exam's questions, then
+# question_cache.invalidate(exam_code) once it has committed.
+def bump_question_version(cur, exam_code):
+    cur.execute(
+        "UPDATE exams SET question_version = question_version + 1 WHERE exam_code = ?",
+        (exam_code,),
+    )
+
+
+def get_question_bank(exam_code):
+    return question_cache.get(exam_code)
+
+
 # Load all questions for an exam code
 def get_exam_questions(exam_code):
-    conn = db.connect(DB)
-    cur = conn.cursor()
+    return get_question_bank(exam_code).questions
 
-    cur.execute("SELECT * FROM questions WHERE exam_code = ?", (exam_code,))
-    questions = cur.fetchall()
 
-    conn.close()
-    return questions
+def _partial_credit(raw):
+    # partial_credit holds a JSON object mapping an option to the fraction of
+    # the question's weight it earns, e.g. {"Paris, France": 0.5}.
+    if not raw:
+        return {}
+    try:
+        credit = json.loads(raw)
+    except ValueError:
+        return {}
+    if not isinstance(credit, dict):
+        return {}
+    # Imports validate this; skip anything malformed stored before they did.
+    parsed = {}
+    for option, fraction in credit.items():
+        try:
+            parsed[str(option)] = float(fraction)
+        except (TypeError, ValueError):
+            continue
+    return parsed
 
 
-# Score calculation
-def calculate_score(form_data):
+def _answer_key(rows):
+    return {
+        str(row[0]): (row[6], 1.0 if row[8] is None else float(row[8]), _partial_credit(row[9]))
+        for row in rows
+    }
+
+
+def _load_answer_key(question_ids):
+    ids = [qid for qid in question_ids if str(qid).isdigit()]
+    if not ids:
+        return {}
+    placeholders = ", ".join("?" for _ in ids)
     conn = db.connect(DB)
     cur = conn.cursor()
+    cur.execute(f"SELECT {_QUESTION_COLUMNS} FROM questions WHERE id IN ({placeholders})", [int(qid) for qid in ids])
+    rows = cur.fetchall()
+    conn.close()
+    return _answer_key(rows)
 
-    score = 0
 
-    for qid in form_data:
-        user_answer = form_data[qid]
+# Score a submitted form against the exam's answer key: from the cached
+# question bank when exam_code is known, otherwise one query over the
+# submitted question ids. Returns score, max_score and a per-question breakdown.
+def score_submission(form_data, exam_code=None):
+    if exam_code:
+        answer_key = get_question_bank(exam_code).answer_key
+    else:
+        answer_key = _load_answer_key(list(form_data))
 
-        cur.execute("SELECT answer FROM questions WHERE id=?", (qid,))
-        correct = cur.fetchone()
+    score = 0.0
+    max_score = 0.0
+    breakdown = []
+    for qid, (correct, weight, partial) in answer_key.items():
+        user_answer = form_data.get(qid)
+        if user_answer is None and not exam_code:
+            continue
+        if user_answer is not None and user_answer == correct:
+            credit = 1.0
+        else:
+            credit = partial.get(user_answer, 0.0)
+        earned = weight * credit
+        score += earned
+        max_score += weight
+        breakdown.append(
+            {
+                "question_id": int(qid),
+                "answer": user_answer,
+                "correct": credit == 1.0,
+                "credit": credit,
+                "weight": weight,
+                "earned": earned,
+            }
+        )
 
-        if correct and correct[0] == user_answer:
-            score += 1
+    return {"score": _number(score), "max_score": _number(max_score), "breakdown": breakdown}
 
-    conn.close()
-    return score
+
+def _number(value):
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+# Score calculation
+def calculate_score(form_data, exam_code=None):
+    return score_submission(form_data, exam_code)["score"]
@@ -0,0 +1,266 @@
+import csv
+import io
+import json
+import os
+from datetime import datetime, timedelta
+
+import database as db
+import risk
+from proctor_ai import metrics
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except Exception:  # pragma: no cover - optional dependency, only for Parquet
+    pyarrow = None
+
+DB = "proctoring.db"
+
+# Exports read through a server-side cursor CHUNK_ROWS rows at a time and
+# serialize each chunk straight into the response, so memory stays flat
+# however many rows match. Parquet writes one row group per chunk.
+CHUNK_ROWS = int(os.getenv("PROCTOR_EXPORT_CHUNK_ROWS", "5000"))
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORTED_ROWS = metrics.counter("proctor_export_rows_total", "Rows streamed by admin exports.", ("dataset",))
+
+
+def _text(value):
+    return None if value is None else str(value)
+
+
+def _violation_row(row):
+    violation_id, user, exam_code, title, violation_type, stamp, screenshot, risk_score = row
+    return (
+        violation_id, user, exam_code, title, violation_type, risk.severity(violation_type),
+        _text(stamp), screenshot, risk_score or 0,
+    )
+
+
+def _attempt_row(row):
+    attempt_id, user, exam_code, title, score, stamp, risk_score, violations = row
+    return (attempt_id, user, exam_code, title, score, _text(stamp), risk_score or 0, violations or 0)
+
+
+def _score_row(row):
+    user, exam_code, title, score, violations, updated_at = row
+    return (user, exam_code, title, score, violations, _text(updated_at))
+
+
+# table: the filtered table; time: its date-range column. Risk scores come
+# from the risk_scores aggregate, joined on (user, exam_code) like risk.py keys it.
+DATASETS = {
+    "violations": {
+        "table": "violations",
+        "time": "timestamp",
+        "sql": """
+            SELECT violations.id, violations.user, violations.exam_code, exams.title, violations.type,
+                   violations.timestamp, violations.screenshot_path, risk_scores.score
+            FROM violations
+            LEFT JOIN exams ON exams.exam_code = violations.exam_code
+            LEFT JOIN risk_scores ON risk_scores.user = violations.user
+                AND risk_scores.exam_code = COALESCE(violations.exam_code, '')
+        """,
+        "order": "violations.timestamp, violations.id",
+        "columns": (
+            ("id", "int"), ("user", "str"), ("exam_code", "str"), ("exam_title", "str"), ("type", "str"),
+            ("severity", "int"), ("timestamp", "str"), ("screenshot_path", "str"), ("risk_score", "int"),
+        ),
+        "row": _violation_row,
+    },
+    "attempts": {
+        "table": "exam_attempts",
+        "time": "timestamp",
+        "sql": """
+            SELECT exam_attempts.id, exam_attempts.user, exam_attempts.exam_code, exams.title,
+                   exam_attempts.score, exam_attempts.timestamp, risk_scores.score, risk_scores.violations
+            FROM exam_attempts
+            LEFT JOIN exams ON exams.exam_code = exam_attempts.exam_code
+            LEFT JOIN risk_scores ON risk_scores.user = exam_attempts.user
+                AND risk_scores.exam_code = COALESCE(exam_attempts.exam_code, '')
+        """,
+        "order": "exam_attempts.timestamp, exam_attempts.id",
+        "columns": (
+            ("id", "int"), ("user", "str"), ("exam_code", "str"), ("exam_title", "str"), ("score", "float"),
+            ("timestamp", "str"), ("risk_score", "int"), ("violations", "int"),
+        ),
+        "row": _attempt_row,
+    },
+    "scores": {
+        "table": "risk_scores",
+        "time": "updated_at",
+        "sql": """
+            SELECT risk_scores.user, risk_scores.exam_code, exams.title, risk_scores.score,
+                   risk_scores.violations, risk_scores.updated_at
+            FROM risk_scores
+            LEFT JOIN exams ON exams.exam_code = risk_scores.exam_code
+        """,
+        "order": "risk_scores.user, risk_scores.exam_code",
+        "columns": (
+            ("user", "str"), ("exam_code", "str"), ("exam_title", "str"), ("risk_score", "int"),
+            ("violations", "int"), ("updated_at", "str"),
+        ),
+        "row": _score_row,
+    },
+}
+
+
+def _parse_time(value, name, end=False):
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be YYYY-MM-DD or YYYY-MM-DD HH:MM:SS") from None
+    # A bare end date includes that whole day.
+    if end and len(value) == 10:
+        parsed += timedelta(days=1)
+    return parsed.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def parse_filters(args):
+    filters = {
+        "exam_code": (args.get("exam_code") or "").strip().upper() or None,
+        "user": (args.get("user") or "").strip() or None,
+        "since": _parse_time(args.get("since"), "since"),
+        "until": _parse_time(args.get("until"), "until", end=True),
+    }
+    return {key: value for key, value in filters.items() if value is not None}
+
+
+def _query(spec, filters):
+    table = spec["table"]
+    clauses, params = [], []
+    for key in ("exam_code", "user"):
+        if key in filters:
+            clauses.append(f"{table}.{key} = ?")
+            params.append(filters[key])
+    if "since" in filters:
+        clauses.append(f"{table}.{spec['time']} >= ?")
+        params.append(filters["since"])
+    if "until" in filters:
+        clauses.append(f"{table}.{spec['time']} < ?")
+        params.append(filters["until"])
+
+    query = spec["sql"]
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    return query + f" ORDER BY {spec['order']}", params
+
+
+def iter_chunks(dataset, filters, chunk_rows=CHUNK_ROWS):
+    spec = DATASETS[dataset]
+    query, params = _query(spec, filters)
+    conn = db.connect(DB)
+    cur = conn.cursor(name=f"export_{dataset}")
+    try:
+        cur.execute(query, params)
+        while True:
+            rows = cur.fetchmany(chunk_rows)
+            if not rows:
+                break
+            EXPORTED_ROWS.inc(dataset, amount=len(rows))
+            yield [spec["row"](row) for row in rows]
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _csv(columns, chunks):
+    buffer = io.StringIO()
+    out = csv.writer(buffer)
+    out.writerow([name for name, _kind in columns])
+    for rows in chunks:
+        out.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    # Header only, when nothing matched.
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _jsonl(columns, chunks):
+    names = [name for name, _kind in columns]
+    for rows in chunks:
+        yield "".join(json.dumps(dict(zip(names, row)), default=str) + "\n" for row in rows)
+
+
+class _ChunkSink(io.RawIOBase):
+    # Write-only file for ParquetWriter; take() hands over what was written
+    # since the last call so each row group is streamed and then dropped.
+    def __init__(self):
+        super().__init__()
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+_ARROW_TYPES = {"int": "int64", "float": "float64", "str": "string"}
+
+
+def _parquet(columns, chunks):
+    schema = pyarrow.schema([(name, _ARROW_TYPES[kind]) for name, kind in columns])
+    sink = _ChunkSink()
+    writer = pyarrow.parquet.ParquetWriter(sink, schema, compression="snappy")
+    try:
+        for rows in chunks:
+            values = list(zip(*rows))
+            writer.write_table(pyarrow.Table.from_arrays(
+                [pyarrow.array(column, type=field.type) for column, field in zip(values, schema)],
+                schema=schema,
+            ))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+
+_WRITERS = {"csv": _csv, "jsonl": _jsonl, "parquet": _parquet}
+
+
+def export(dataset, fmt, filters):
+    """Validate the request and return (chunks, mimetype, filename).
+
+    Nothing is read until the chunks are iterated, so the caller can turn a
+    ValueError into a 400 before the response starts streaming.
+    """
+    if dataset not in DATASETS:
+        raise ValueError(f"dataset must be one of {', '.join(DATASETS)}")
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    if fmt == "parquet" and pyarrow is None:
+        raise ValueError("Parquet export needs pyarrow installed")
+
+    columns = DATASETS[dataset]["columns"]
+    chunks = _WRITERS[fmt](columns, iter_chunks(dataset, filters))
+    parts = [dataset] + [
+        str(filters[key]).replace(" ", "T").replace(":", "") for key in ("exam_code", "user", "since", "until")
+        if key in filters
+    ]
+    # ASCII only: Content-Disposition must be latin-1 encodable.
+    filename = "-".join(
+        "".join(ch if (ch.isascii() and ch.isalnum()) or ch in "-_" else "_" for ch in part) for part in parts
+    )
+    return chunks, FORMATS[fmt], f"{filename}.{fmt}"
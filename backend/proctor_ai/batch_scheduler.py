@@ -0,0 +1,134 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class InferenceScheduler:
+    """Collects frames from concurrent requests into micro-batches.
+
+    A batch is dispatched as soon as ``max_batch_size`` frames are queued or
+    the oldest queued frame has waited ``max_wait_ms``, whichever comes first.
+    """
+
+    def __init__(self, analyze_batch, max_batch_size=16, max_wait_ms=25, workers=1):
+        self._analyze_batch = analyze_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+        self._workers = max(1, int(workers))
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopped = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "frames": 0,
+            "errors": 0,
+            "last_batch_size": 0,
+            "max_batch_size_seen": 0,
+            "queue_wait_ms_total": 0.0,
+            "queue_wait_ms_max": 0.0,
+            "inference_ms_total": 0.0,
+        }
+
+    def start(self):
+        with self._cond:
+            if self._threads:
+                return
+            self._stopped = False
+            for index in range(self._workers):
+                thread = threading.Thread(
+                    target=self._run, name=f"inference-batch-{index}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        self._threads = []
+
+    def submit(self, image_bgr, enable_phone=True):
+        if not self._threads:
+            self.start()
+        future = Future()
+        with self._cond:
+            self._pending.append((time.monotonic(), image_bgr, bool(enable_phone), future))
+            self._cond.notify()
+        return future
+
+    def analyze(self, image_bgr, enable_phone=True, timeout=None):
+        return self.submit(image_bgr, enable_phone).result(timeout=timeout)
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def stats(self):
+        with self._stats_lock:
+            data = dict(self._stats)
+        batches = data["batches"]
+        frames = data["frames"]
+        data["avg_batch_size"] = frames / batches if batches else 0.0
+        data["avg_queue_wait_ms"] = data["queue_wait_ms_total"] / frames if frames else 0.0
+        data["avg_inference_ms"] = data["inference_ms_total"] / batches if batches else 0.0
+        data["queue_depth"] = self.queue_depth()
+        data["max_batch_size"] = self.max_batch_size
+        data["max_wait_ms"] = self.max_wait * 1000.0
+        return data
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending and not self._stopped:
+                self._cond.wait()
+            if self._stopped and not self._pending:
+                return None
+
+            deadline = self._pending[0][0] + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._stopped:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=remaining)
+
+            batch = []
+            while self._pending and len(batch) < self.max_batch_size:
+                batch.append(self._pending.popleft())
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.monotonic()
+            waits_ms = [(started - enqueued) * 1000.0 for enqueued, _, _, _ in batch]
+            images = [item[1] for item in batch]
+            flags = [item[2] for item in batch]
+
+            try:
+                results = self._analyze_batch(images, flags)
+            except Exception as exc:
+                with self._stats_lock:
+                    self._stats["errors"] += 1
+                for _, _, _, future in batch:
+                    future.set_exception(exc)
+                continue
+
+            inference_ms = (time.monotonic() - started) * 1000.0
+            with self._stats_lock:
+                self._stats["batches"] += 1
+                self._stats["frames"] += len(batch)
+                self._stats["last_batch_size"] = len(batch)
+                self._stats["max_batch_size_seen"] = max(self._stats["max_batch_size_seen"], len(batch))
+                self._stats["queue_wait_ms_total"] += sum(waits_ms)
+                self._stats["queue_wait_ms_max"] = max(self._stats["queue_wait_ms_max"], max(waits_ms))
+                self._stats["inference_ms_total"] += inference_ms
+
+            for (_, _, _, future), result in zip(batch, results):
+                future.set_result(result)
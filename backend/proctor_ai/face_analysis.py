@@ -0,0 +1,47 @@
+from collections import namedtuple
+
+import cv2
+
+from proctor_ai import face_module, gaze_module, metrics
+from proctor_ai.headpose_module import estimate_headpose
+
+
+FaceAnalysis = namedtuple("FaceAnalysis", ["face_count", "face_boxes", "gaze", "headpose"])
+
+
+def _face_boxes(detections, image_width, image_height):
+    boxes = []
+    for detection in detections or []:
+        box = detection.location_data.relative_bounding_box
+        x = max(0, int(box.xmin * image_width))
+        y = max(0, int(box.ymin * image_height))
+        boxes.append((x, y, int(box.width * image_width), int(box.height * image_height)))
+    return boxes
+
+
+def analyze_faces(image_bgr):
+    # One BGR->RGB conversion shared by the detector and the mesh; marking it
+    # read-only lets MediaPipe use the buffer without copying it.
+    with metrics.stage("bgr_to_rgb"):
+        rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+    rgb.flags.writeable = False
+    height, width = rgb.shape[:2]
+
+    with metrics.stage("face_detection"):
+        boxes = _face_boxes(face_module.detect_faces(rgb), width, height)
+    if not boxes:
+        # Nothing for the mesh to find; skip the landmark pass entirely.
+        return FaceAnalysis(0, boxes, "no_face", "no_face")
+
+    with metrics.stage("face_mesh"):
+        landmarks = gaze_module.face_landmarks(rgb)
+    if landmarks is None:
+        return FaceAnalysis(len(boxes), boxes, "no_face", "no_face")
+
+    with metrics.stage("gaze_headpose"):
+        return FaceAnalysis(
+            len(boxes),
+            boxes,
+            gaze_module.gaze_from_landmarks(landmarks),
+            estimate_headpose(landmarks, width, height),
+        )
@@ -1,14 +1,40 @@
 import cv2
+import numpy as np
 import mediapipe as mp
 
+from proctor_ai.model_pool import ModelPool
+
 
 mp_face_detection = mp.solutions.face_detection
-_face_detector = mp_face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
+
+def _create_detector():
+    return mp_face_detection.FaceDetection(model_selection=0, min_detection_confidence=0.5)
+
+
+def _warm_detector(detector):
+    detector.process(np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+_detectors = ModelPool("face_detection", _create_detector, warmer=_warm_detector)
+
+
+def warm_up():
+    _detectors.warm_up()
+
+
+def pool_stats():
+    return _detectors.stats()
+
+
+def detect_faces(rgb):
+    with _detectors.checkout() as detector:
+        return detector.process(rgb).detections
 
 
 def count_faces(image_bgr):
     rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    results = _face_detector.process(rgb)
-    if not results.detections:
+    detections = detect_faces(rgb)
+    if not detections:
         return 0
-    return len(results.detections)
+    return len(detections)
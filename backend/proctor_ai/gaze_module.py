@@ -1,18 +1,50 @@
 import cv2
+import numpy as np
 import mediapipe as mp
 
+from proctor_ai.model_pool import ModelPool
+
 
 mp_face_mesh = mp.solutions.face_mesh
-_mesh = mp_face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True, max_num_faces=1)
+
+
+def _create_mesh():
+    return mp_face_mesh.FaceMesh(static_image_mode=True, refine_landmarks=True, max_num_faces=1)
+
+
+def _warm_mesh(mesh):
+    mesh.process(np.zeros((240, 320, 3), dtype=np.uint8))
+
+
+_meshes = ModelPool("face_mesh", _create_mesh, warmer=_warm_mesh)
+
+
+def warm_up():
+    _meshes.warm_up()
+
+
+def pool_stats():
+    return _meshes.stats()
+
+
+def face_landmarks(rgb):
+    with _meshes.checkout() as mesh:
+        faces = mesh.process(rgb).multi_face_landmarks
+    if not faces:
+        return None
+    return faces[0].landmark
 
 
 def estimate_gaze(image_bgr):
     rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
-    results = _mesh.process(rgb)
-    if not results.multi_face_landmarks:
+    landmarks = face_landmarks(rgb)
+    if landmarks is None:
         return "no_face"
 
-    landmarks = results.multi_face_landmarks[0].landmark
+    return gaze_from_landmarks(landmarks)
+
+
+def gaze_from_landmarks(landmarks):
     left_iris = landmarks[474]
     right_iris = landmarks[469]
 
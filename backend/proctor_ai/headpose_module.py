@@ -1,2 +1,68 @@
-def estimate_headpose():
+import cv2
+import numpy as np
+
+
+# Generic 3D face model (millimetres, nose tip at the origin) matched to
+# MediaPipe FaceMesh landmark indexes.
+MODEL_POINTS = np.array(
+    [
+        (0.0, 0.0, 0.0),  # 1: nose tip
+        (0.0, -63.6, -12.5),  # 152: chin
+        (-43.3, 32.7, -26.0),  # 33: right eye outer corner (image left)
+        (43.3, 32.7, -26.0),  # 263: left eye outer corner (image right)
+        (-28.9, -28.9, -24.1),  # 61: right mouth corner
+        (28.9, -28.9, -24.1),  # 291: left mouth corner
+    ],
+    dtype=np.float64,
+)
+LANDMARK_IDS = (1, 152, 33, 263, 61, 291)
+
+YAW_LIMIT = 30.0
+PITCH_LIMIT = 20.0
+
+
+def head_angles(landmarks, image_width, image_height):
+    image_points = np.array(
+        [(landmarks[i].x * image_width, landmarks[i].y * image_height) for i in LANDMARK_IDS],
+        dtype=np.float64,
+    )
+    focal = float(image_width)
+    camera = np.array(
+        [[focal, 0, image_width / 2.0], [0, focal, image_height / 2.0], [0, 0, 1]],
+        dtype=np.float64,
+    )
+    ok, rvec, _ = cv2.solvePnP(
+        MODEL_POINTS, image_points, camera, np.zeros((4, 1)), flags=cv2.SOLVEPNP_ITERATIVE
+    )
+    if not ok:
+        return None
+
+    rotation, _ = cv2.Rodrigues(rvec)
+    # Undo the camera's y-down/z-forward axes so a frontal face is identity.
+    # Positive yaw turns the nose towards the right of the image, positive
+    # pitch tilts it up.
+    rotation = np.diag([1.0, -1.0, -1.0]) @ rotation
+    sy = np.hypot(rotation[0, 0], rotation[1, 0])
+    pitch = -np.degrees(np.arctan2(rotation[2, 1], rotation[2, 2]))
+    yaw = np.degrees(np.arctan2(-rotation[2, 0], sy))
+    roll = np.degrees(np.arctan2(rotation[1, 0], rotation[0, 0]))
+    return float(yaw), float(pitch), float(roll)
+
+
+def estimate_headpose(landmarks=None, image_width=None, image_height=None):
+    if landmarks is None:
+        return "center"
+
+    angles = head_angles(landmarks, image_width, image_height)
+    if angles is None:
+        return "center"
+
+    # Directions are in image space, like gaze_module.
+    yaw, pitch, _ = angles
+    if yaw > YAW_LIMIT:
+        return "right"
+    if yaw < -YAW_LIMIT:
+        return "left"
+    if pitch < -PITCH_LIMIT:
+        return "down"
     return "center"
@@ -0,0 +1,99 @@
+import importlib
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+WARM_UP_ON_START = os.getenv("PROCTOR_WARM_UP", "1") == "1"
+
+# Detector name -> module exposing warm_up(). Nothing here is imported until
+# warm-up runs, so importing this module (and the Flask app) stays cheap.
+DETECTORS = {
+    "face_detection": "proctor_ai.face_module",
+    "face_mesh": "proctor_ai.gaze_module",
+    "phone": "proctor_ai.phone_module",
+}
+
+_status = {}
+_status_lock = threading.Lock()
+_started = False
+
+
+def _set(name, **fields):
+    with _status_lock:
+        _status.setdefault(name, {"state": "cold"}).update(fields)
+
+
+def _warm(name, target):
+    _set(name, state="warming", error=None)
+    started = time.monotonic()
+    try:
+        target()
+    except Exception as exc:
+        _set(name, state="failed", error=repr(exc), seconds=time.monotonic() - started)
+        return
+    _set(name, state="ready", seconds=time.monotonic() - started)
+
+
+def detector_targets():
+    def target(module_name):
+        return lambda: importlib.import_module(module_name).warm_up()
+
+    return {name: target(module) for name, module in DETECTORS.items()}
+
+
+def _targets():
+    from proctor_ai import runtime
+
+    if runtime.EXECUTION_MODE == "process":
+        # The models live in the worker processes, which warm themselves.
+        return {"analyzer_workers": runtime.get_process_pool}
+    return detector_targets()
+
+
+def _run(targets):
+    # Each detector imports and builds its graphs on its own thread; MediaPipe
+    # and torch release the GIL for most of that work.
+    with ThreadPoolExecutor(max_workers=len(targets), thread_name_prefix="model-warm-up") as executor:
+        wait([executor.submit(_warm, name, target) for name, target in targets.items()])
+
+
+def warm_up(targets=None):
+    targets = targets or _targets()
+    for name in targets:
+        _set(name, state="cold")
+    _run(targets)
+
+
+def start():
+    global _started
+    # Spawned analyzer workers re-import the app module (as __mp_main__ when
+    # it was started with "python app.py"); they warm their own detectors in
+    # _worker_main and must not start another pool.
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _status_lock:
+        if _started:
+            return None
+        _started = True
+
+    targets = _targets()
+    for name in targets:
+        _set(name, state="cold")
+    thread = threading.Thread(target=_run, args=(targets,), name="model-lifecycle", daemon=True)
+    thread.start()
+    return thread
+
+
+def readiness():
+    with _status_lock:
+        detectors = {name: dict(status) for name, status in _status.items()}
+        started = _started
+    if not started and not detectors:
+        # PROCTOR_WARM_UP=0: models load on the first request that needs
+        # them, so there is nothing to wait for before taking traffic.
+        return {"ready": True, "mode": "lazy", "detectors": detectors}
+    ready = bool(detectors) and all(status["state"] == "ready" for status in detectors.values())
+    return {"ready": ready, "mode": "warm", "detectors": detectors}
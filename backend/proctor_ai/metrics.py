@@ -0,0 +1,176 @@
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+# Process-local metrics in the Prometheus text format. With PROCTOR_METRICS=0
+# every timer is a shared no-op and counters return immediately.
+ENABLED = os.getenv("PROCTOR_METRICS", "1") == "1"
+
+# Seconds; tuned for per-frame stages (sub-millisecond decode up to slow
+# first-call model loads).
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _label_text(labelnames, values):
+    if not labelnames:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+        for name, value in zip(labelnames, values)
+    )
+    return "{" + pairs + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        if not ENABLED:
+            return
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in items:
+            yield self.name, _label_text(self.labelnames, labels), value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    @contextmanager
+    def time(self, *labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(counts), total, count) for labels, (counts, total, count) in self._series.items()]
+        for labels, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield (
+                    self.name + "_bucket",
+                    _label_text(self.labelnames + ("le",), labels + (le,)),
+                    cumulative,
+                )
+            yield self.name + "_sum", _label_text(self.labelnames, labels), total
+            yield self.name + "_count", _label_text(self.labelnames, labels), count
+
+
+class Gauge:
+    kind = "gauge"
+
+    # Read at scrape time from a callback, e.g. a queue's current depth.
+    def __init__(self, name, documentation, read):
+        self.name = name
+        self.documentation = documentation
+        self._read = read
+
+    def samples(self):
+        try:
+            value = self._read()
+        except Exception:
+            return
+        if value is not None:
+            yield self.name, "", value
+
+
+_registry = {}
+_registry_lock = threading.Lock()
+
+
+def _register(metric):
+    with _registry_lock:
+        existing = _registry.get(metric.name)
+        if existing is not None:
+            return existing
+        _registry[metric.name] = metric
+        return metric
+
+
+def counter(name, documentation, labelnames=()):
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def gauge(name, documentation, read):
+    # Re-registering replaces the callback so reloaded modules report live state.
+    metric = Gauge(name, documentation, read)
+    with _registry_lock:
+        _registry[name] = metric
+    return metric
+
+
+STAGE_SECONDS = histogram(
+    "proctor_stage_seconds", "Time spent in each stage of frame analysis.", ("stage",)
+)
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+# Time a block as one stage of the proctoring pipeline.
+def stage(name):
+    if not ENABLED:
+        return _NOOP
+    return STAGE_SECONDS.time(name)
+
+
+def render():
+    with _registry_lock:
+        metrics = sorted(_registry.values(), key=lambda metric: metric.name)
+    lines = []
+    for metric in metrics:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        for name, labels, value in metric.samples():
+            lines.append(f"{name}{labels} {value}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,63 @@
+import os
+import queue
+import threading
+from contextlib import contextmanager
+
+
+DEFAULT_POOL_SIZE = int(os.getenv("PROCTOR_MODEL_POOL_SIZE", str(min(4, os.cpu_count() or 1))))
+
+
+class ModelPool:
+    """Fixed-size pool of model instances, checked out by one thread at a time.
+
+    MediaPipe graphs and YOLO predictors keep per-call state, so an instance is
+    never shared between concurrent callers. Instances are created lazily up to
+    ``size`` unless ``warm_up`` is called first.
+    """
+
+    def __init__(self, name, factory, size=None, warmer=None):
+        self.name = name
+        self.size = max(1, int(size or DEFAULT_POOL_SIZE))
+        self._factory = factory
+        self._warmer = warmer
+        # LIFO keeps the most recently used (cache-warm) instance in rotation.
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+
+    def _try_create(self):
+        with self._lock:
+            if self._created >= self.size:
+                return None
+            self._created += 1
+        try:
+            return self._factory()
+        except Exception:
+            with self._lock:
+                self._created -= 1
+            raise
+
+    def warm_up(self):
+        while True:
+            instance = self._try_create()
+            if instance is None:
+                return
+            if self._warmer is not None:
+                self._warmer(instance)
+            self._idle.put(instance)
+
+    @contextmanager
+    def checkout(self, timeout=None):
+        try:
+            instance = self._idle.get_nowait()
+        except queue.Empty:
+            instance = self._try_create()
+            if instance is None:
+                instance = self._idle.get(timeout=timeout)
+        try:
+            yield instance
+        finally:
+            self._idle.put(instance)
+
+    def stats(self):
+        return {"name": self.name, "size": self.size, "created": self._created, "idle": self._idle.qsize()}
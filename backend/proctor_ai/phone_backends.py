@@ -0,0 +1,165 @@
+import argparse
+import os
+
+import cv2
+import numpy as np
+
+
+# COCO class index of "cell phone" in the stock YOLOv8 weights.
+PHONE_CLASS_ID = 67
+LETTERBOX_FILL = 114
+
+
+class UltralyticsBackend:
+    name = "ultralytics"
+
+    def __init__(self, weights="yolov8n.pt"):
+        from ultralytics import YOLO
+
+        self._model = YOLO(weights)
+
+    def detect(self, images_bgr, imgsz, conf):
+        # The class filter runs inside the model's NMS, so every returned box
+        # is already a phone.
+        results = self._model.predict(
+            list(images_bgr), verbose=False, imgsz=imgsz, conf=conf, classes=[PHONE_CLASS_ID]
+        )
+        return [len(result.boxes) > 0 for result in results]
+
+
+class _ExportedBackend:
+    """Shared pre/post-processing for YOLOv8 graphs exported without NMS.
+
+    The raw head output is ``(batch, 4 + classes, anchors)``. Ultralytics keeps
+    an anchor when its best class score clears ``conf`` and labels it with that
+    class; NMS never removes the highest-scoring box of a class, so "any anchor
+    whose best class is a phone" gives the same answer as the PyTorch path.
+    """
+
+    input_size = None
+    dynamic_batch = False
+
+    def _run(self, batch):
+        raise NotImplementedError
+
+    def _letterbox(self, image_bgr, size):
+        height, width = image_bgr.shape[:2]
+        scale = min(size / height, size / width)
+        new_w, new_h = max(1, round(width * scale)), max(1, round(height * scale))
+        canvas = np.full((size, size, 3), LETTERBOX_FILL, dtype=np.uint8)
+        top, left = (size - new_h) // 2, (size - new_w) // 2
+        if (new_w, new_h) != (width, height):
+            image_bgr = cv2.resize(image_bgr, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        canvas[top:top + new_h, left:left + new_w] = image_bgr
+        return canvas
+
+    def _to_tensor(self, images_bgr, size):
+        batch = np.stack([self._letterbox(image, size) for image in images_bgr])
+        # BGR -> RGB, HWC -> CHW, 0-255 -> 0-1.
+        return np.ascontiguousarray(batch[..., ::-1].transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+    def detect(self, images_bgr, imgsz, conf):
+        size = self.input_size or imgsz
+        if self.dynamic_batch:
+            outputs = self._run(self._to_tensor(images_bgr, size))
+        else:
+            outputs = np.concatenate([self._run(self._to_tensor([image], size)) for image in images_bgr])
+
+        scores = outputs[:, 4:, :]
+        best = scores.argmax(axis=1)
+        best_score = scores.max(axis=1)
+        hits = (best == PHONE_CLASS_ID) & (best_score >= conf)
+        return [bool(row.any()) for row in hits]
+
+
+class OnnxBackend(_ExportedBackend):
+    name = "onnx"
+
+    def __init__(self, path="yolov8n.onnx", threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = int(threads)
+        self._session = ort.InferenceSession(path, options, providers=["CPUExecutionProvider"])
+        model_input = self._session.get_inputs()[0]
+        self._input_name = model_input.name
+        batch, _, height, _ = model_input.shape
+        self.dynamic_batch = not isinstance(batch, int)
+        self.input_size = height if isinstance(height, int) else None
+
+    def _run(self, batch):
+        return self._session.run(None, {self._input_name: batch})[0]
+
+
+class OpenVinoBackend(_ExportedBackend):
+    name = "openvino"
+
+    def __init__(self, path="yolov8n_openvino_model/yolov8n.xml", threads=None):
+        import openvino as ov
+
+        core = ov.Core()
+        config = {"INFERENCE_NUM_THREADS": int(threads)} if threads else {}
+        model = core.read_model(path)
+        self._compiled = core.compile_model(model, "CPU", config)
+        shape = model.inputs[0].get_partial_shape()
+        self.dynamic_batch = shape[0].is_dynamic
+        self.input_size = None if shape[2].is_dynamic else shape[2].get_length()
+
+    def _run(self, batch):
+        return self._compiled([batch])[0]
+
+
+BACKENDS = {
+    UltralyticsBackend.name: UltralyticsBackend,
+    OnnxBackend.name: OnnxBackend,
+    OpenVinoBackend.name: OpenVinoBackend,
+}
+
+
+def create_backend(name=None, model_path=None, threads=None):
+    name = (name or os.getenv("PROCTOR_PHONE_BACKEND", "ultralytics")).strip().lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown phone detector backend: {name}")
+    model_path = model_path or os.getenv("PROCTOR_PHONE_MODEL")
+    threads = threads or os.getenv("PROCTOR_PHONE_THREADS")
+
+    backend_cls = BACKENDS[name]
+    if name == UltralyticsBackend.name:
+        return backend_cls(model_path) if model_path else backend_cls()
+    if model_path:
+        return backend_cls(model_path, threads=threads)
+    return backend_cls(threads=threads)
+
+
+def export(weights="yolov8n.pt", fmt="onnx", imgsz=320, int8=False):
+    from ultralytics import YOLO
+
+    model = YOLO(weights)
+    if fmt == "openvino":
+        return model.export(format="openvino", imgsz=imgsz, int8=int8, dynamic=True)
+
+    path = model.export(format="onnx", imgsz=imgsz, dynamic=True, simplify=True)
+    if not int8:
+        return path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantized = os.path.splitext(path)[0] + "_int8.onnx"
+    quantize_dynamic(path, quantized, weight_type=QuantType.QUInt8)
+    return quantized
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the phone detector for a lightweight CPU runtime.")
+    parser.add_argument("--weights", default="yolov8n.pt")
+    parser.add_argument("--format", choices=["onnx", "openvino"], default="onnx")
+    parser.add_argument("--imgsz", type=int, default=320)
+    parser.add_argument("--int8", action="store_true", help="also quantize weights to INT8")
+    args = parser.parse_args()
+    print(export(args.weights, args.format, args.imgsz, args.int8))
+
+
+if __name__ == "__main__":
+    main()
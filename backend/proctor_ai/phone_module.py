@@ -1,23 +1,94 @@
-from ultralytics import YOLO
+import os
 
+import numpy as np
 
-_model = None
+from proctor_ai import metrics
+from proctor_ai.model_pool import ModelPool
+from proctor_ai.phone_backends import create_backend
 
 
-def _get_model():
-    global _model
-    if _model is None:
-        _model = YOLO("yolov8n.pt")
-    return _model
+IMG_SIZE = 320
+CONFIDENCE = 0.2
 
+# Scan only the area around and below detected faces instead of the whole frame.
+ROI_ENABLED = os.getenv("PROCTOR_PHONE_ROI", "0") == "1"
+# Face box multiples added on each side (left/right, above); the region always
+# extends to the bottom of the frame, where hands and desk are.
+ROI_SIDE = 1.5
+ROI_ABOVE = 0.5
+# Fall back to the full frame when the region would cover most of it anyway.
+ROI_MAX_FRACTION = 0.8
 
-def detect_phone(image_bgr):
-    model = _get_model()
-    results = model.predict(image_bgr, verbose=False, imgsz=320, conf=0.2)
-    for result in results:
-        for box in result.boxes:
-            cls_id = int(box.cls[0])
-            label = result.names.get(cls_id, "")
-            if label == "cell phone":
-                return True
-    return False
+
+# PROCTOR_PHONE_BACKEND selects ultralytics (default), onnx or openvino; see
+# proctor_ai/phone_backends.py.
+def _create_model():
+    return create_backend()
+
+
+def _warm_model(model):
+    model.detect([np.zeros((IMG_SIZE, IMG_SIZE, 3), dtype=np.uint8)], IMG_SIZE, CONFIDENCE)
+
+
+_models = ModelPool("phone_yolo", _create_model, warmer=_warm_model)
+
+
+def warm_up():
+    _models.warm_up()
+
+
+def pool_stats():
+    return _models.stats()
+
+
+def phone_roi(image_shape, face_boxes):
+    height, width = image_shape[:2]
+    if not face_boxes:
+        return None
+
+    x0, y0, x1 = width, height, 0
+    for x, y, w, h in face_boxes:
+        x0 = min(x0, int(x - ROI_SIDE * w))
+        x1 = max(x1, int(x + w + ROI_SIDE * w))
+        y0 = min(y0, int(y - ROI_ABOVE * h))
+    x0, y0, x1 = max(0, x0), max(0, y0), min(width, x1)
+
+    if x1 <= x0 or y0 >= height:
+        return None
+    if (x1 - x0) * (height - y0) >= ROI_MAX_FRACTION * width * height:
+        return None
+    return x0, y0, x1, height
+
+
+def _crop(image_bgr, roi):
+    if roi is None:
+        return image_bgr
+    x0, y0, x1, y1 = roi
+    # A slice is a view; no pixels are copied.
+    return image_bgr[y0:y1, x0:x1]
+
+
+def _img_size(images):
+    # Small crops are not upscaled to IMG_SIZE; YOLO needs a multiple of 32.
+    longest = max(max(image.shape[:2]) for image in images)
+    return min(IMG_SIZE, max(32, -(-longest // 32) * 32))
+
+
+def detect_phone(image_bgr, face_boxes=None):
+    return detect_phone_batch([image_bgr], [face_boxes])[0]
+
+
+def detect_phone_batch(images_bgr, face_boxes=None):
+    if not images_bgr:
+        return []
+
+    if ROI_ENABLED and face_boxes is not None:
+        images = [
+            _crop(image_bgr, phone_roi(image_bgr.shape, boxes))
+            for image_bgr, boxes in zip(images_bgr, face_boxes)
+        ]
+    else:
+        images = list(images_bgr)
+
+    with _models.checkout() as model, metrics.stage("phone"):
+        return model.detect(images, _img_size(images), CONFIDENCE)
@@ -0,0 +1,216 @@
+import atexit
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from proctor_ai.runtime import AnalyzerUnavailable
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SLOT_BYTES = 1280 * 720 * 3
+RESTART_RETRY_S = 5.0
+
+
+class WorkerCrashed(AnalyzerUnavailable):
+    pass
+
+
+class WorkerError(AnalyzerUnavailable):
+    """analyze_frame raised inside the worker; the worker itself is fine."""
+
+
+def _attach(name):
+    # Spawned workers share the parent's resource tracker, so attaching here
+    # does not register a second owner; the parent alone unlinks the block.
+    return shared_memory.SharedMemory(name=name)
+
+
+def _worker_main(conn, shm_name):
+    # One model instance per process; parallelism comes from the process count.
+    os.environ["PROCTOR_MODEL_POOL_SIZE"] = "1"
+    from proctor_ai import lifecycle
+    from proctor_ai.violation_engine import analyze_frame
+
+    lifecycle.warm_up(lifecycle.detector_targets())
+    shm = _attach(shm_name)
+    conn.send(("ready", os.getpid()))
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, KeyboardInterrupt):
+            break
+
+        kind = message[0]
+        if kind == "stop":
+            break
+        if kind == "attach":
+            shm.close()
+            shm = _attach(message[1])
+            conn.send(("ok", None))
+            continue
+
+        _, shape, enable_phone = message
+        try:
+            frame = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+            conn.send(("ok", analyze_frame(frame, enable_phone=enable_phone)))
+            del frame
+        except Exception as exc:
+            conn.send(("error", repr(exc)))
+
+    shm.close()
+    conn.close()
+
+
+class _Worker:
+    def __init__(self, ctx, slot_bytes, start_timeout):
+        self._ctx = ctx
+        self._start_timeout = start_timeout
+        self.shm = shared_memory.SharedMemory(create=True, size=slot_bytes)
+        self.process = None
+        self.conn = None
+        self.restarts = 0
+        self.start()
+
+    def start(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        process = self._ctx.Process(
+            target=_worker_main, args=(child_conn, self.shm.name), name="proctor-analyzer", daemon=True
+        )
+        process.start()
+        child_conn.close()
+        self.process = process
+        self.conn = parent_conn
+
+    def wait_ready(self):
+        if not self.conn.poll(self._start_timeout):
+            self.kill()
+            raise WorkerCrashed("analyzer worker did not become ready")
+        self.conn.recv()
+
+    def spawn(self):
+        self.start()
+        self.wait_ready()
+
+    def kill(self):
+        if self.process is not None and self.process.is_alive():
+            self.process.kill()
+        if self.process is not None:
+            self.process.join(timeout=5)
+        if self.conn is not None:
+            self.conn.close()
+
+    def restart(self):
+        self.kill()
+        self.restarts += 1
+        self.spawn()
+
+    def ensure_capacity(self, nbytes):
+        if nbytes <= self.shm.size:
+            return
+        old = self.shm
+        self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        self.conn.send(("attach", self.shm.name))
+        self.conn.recv()
+        old.close()
+        old.unlink()
+
+    def request(self, frame, enable_phone, timeout):
+        self.ensure_capacity(frame.nbytes)
+        np.ndarray(frame.shape, dtype=np.uint8, buffer=self.shm.buf)[...] = frame
+        self.conn.send(("analyze", frame.shape, bool(enable_phone)))
+        if not self.conn.poll(timeout):
+            raise TimeoutError("analyzer worker timed out")
+        return self.conn.recv()
+
+    def close(self):
+        try:
+            if self.process is not None and self.process.is_alive():
+                self.conn.send(("stop",))
+                self.process.join(timeout=5)
+        except (OSError, BrokenPipeError):
+            pass
+        self.kill()
+        self.shm.close()
+        self.shm.unlink()
+
+
+class ProcessAnalyzerPool:
+    """Runs ``analyze_frame`` in long-lived worker processes.
+
+    Each worker loads the models once and owns a shared-memory slot; frames are
+    copied into the slot and only the shape crosses the pipe. A worker that
+    dies or hangs is replaced on a background thread, so the request that
+    hit it fails fast and later requests use the remaining workers meanwhile.
+    """
+
+    def __init__(self, size=None, slot_bytes=DEFAULT_SLOT_BYTES, start_timeout=120):
+        self.size = max(1, int(size or os.cpu_count() or 1))
+        self._ctx = mp.get_context("spawn")
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        # Start every worker before waiting on any, so they load models in parallel.
+        self._workers = [_Worker(self._ctx, slot_bytes, start_timeout) for _ in range(self.size)]
+        for worker in self._workers:
+            worker.wait_ready()
+            self._idle.put(worker)
+        atexit.register(self.close)
+
+    def analyze(self, image_bgr, enable_phone=True, timeout=10):
+        frame = np.ascontiguousarray(image_bgr, dtype=np.uint8)
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("no analyzer worker available") from None
+        try:
+            status, result = worker.request(frame, enable_phone, timeout)
+        except (EOFError, OSError, TimeoutError) as exc:
+            self._restart_in_background(worker)
+            if isinstance(exc, TimeoutError):
+                raise
+            raise WorkerCrashed(f"analyzer worker exited: {exc!r}") from exc
+        self._idle.put(worker)
+
+        if status != "ok":
+            raise WorkerError(result)
+        return result
+
+    def _restart_in_background(self, worker):
+        def restart():
+            while not self._closed:
+                try:
+                    worker.restart()
+                except Exception:
+                    logger.exception("analyzer worker restart failed, retrying in %.0fs", RESTART_RETRY_S)
+                    time.sleep(RESTART_RETRY_S)
+                    continue
+                if self._closed:
+                    worker.kill()
+                else:
+                    self._idle.put(worker)
+                return
+
+        threading.Thread(target=restart, name="proctor-analyzer-restart", daemon=True).start()
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "restarts": sum(worker.restarts for worker in self._workers),
+            "pids": [worker.process.pid for worker in self._workers if worker.process is not None],
+        }
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        for worker in self._workers:
+            worker.close()
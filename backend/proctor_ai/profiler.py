@@ -0,0 +1,115 @@
+import collections
+import os
+import signal
+import sys
+import threading
+import time
+
+# A stdlib sampling profiler for one worker process. It samples every thread's
+# stack at a fixed interval and aggregates them as collapsed stacks
+# ("frame;frame;frame count"), the input format of flamegraph.pl/speedscope.
+# Start it through the admin route (it profiles whichever worker serves the
+# request) or with `kill -USR2 <pid>`, which toggles it for that process and
+# writes the result to PROCTOR_PROFILE_DIR when stopped.
+DEFAULT_INTERVAL_MS = float(os.getenv("PROCTOR_PROFILE_INTERVAL_MS", "10"))
+PROFILE_DIR = os.getenv("PROCTOR_PROFILE_DIR", "/tmp")
+MAX_DEPTH = 64
+
+
+def _frame_name(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stacks = collections.Counter()
+        self._thread = None
+        self._stop = threading.Event()
+        self.samples = 0
+        self.started_at = None
+        self.interval_s = DEFAULT_INTERVAL_MS / 1000.0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval_ms=None, duration_s=None):
+        with self._lock:
+            if self.running:
+                return False
+            self._stacks.clear()
+            self.samples = 0
+            self.started_at = time.time()
+            self.interval_s = (interval_ms or DEFAULT_INTERVAL_MS) / 1000.0
+            self._stop.clear()
+            self._thread = threading.Thread(
+                target=self._run, args=(duration_s,), name="sampling-profiler", daemon=True
+            )
+            self._thread.start()
+            return True
+
+    def stop(self):
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+
+    def _run(self, duration_s):
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + duration_s if duration_s else None
+        while not self._stop.wait(self.interval_s):
+            if deadline is not None and time.monotonic() >= deadline:
+                break
+            frames = sys._current_frames()
+            batch = []
+            for thread_id, frame in frames.items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < MAX_DEPTH:
+                    stack.append(_frame_name(frame))
+                    frame = frame.f_back
+                batch.append(";".join(reversed(stack)))
+            with self._lock:
+                self._stacks.update(batch)
+                self.samples += 1
+
+    def collapsed(self):
+        with self._lock:
+            items = self._stacks.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in items)
+
+    def status(self):
+        return {
+            "pid": os.getpid(),
+            "running": self.running,
+            "samples": self.samples,
+            "interval_ms": self.interval_s * 1000.0,
+            "started_at": self.started_at,
+        }
+
+    def dump(self, directory=PROFILE_DIR):
+        path = os.path.join(directory, f"proctor-profile-{os.getpid()}-{int(time.time())}.folded")
+        with open(path, "w") as f:
+            f.write(self.collapsed())
+        return path
+
+
+profiler = SamplingProfiler()
+
+
+def _toggle(_signum, _frame):
+    if profiler.running:
+        # Stop and dump off the signal handler's thread.
+        threading.Thread(target=lambda: (profiler.stop(), profiler.dump()), daemon=True).start()
+    else:
+        profiler.start()
+
+
+def install_signal_handler(signum=getattr(signal, "SIGUSR2", None)):
+    if signum is None or threading.current_thread() is not threading.main_thread():
+        return False
+    signal.signal(signum, _toggle)
+    return True
@@ -0,0 +1,122 @@
+import os
+import sys
+import threading
+
+from proctor_ai import metrics
+
+
+# inline: analyze on the request thread; batch: micro-batch across requests;
+# process: hand frames to long-lived worker processes over shared memory.
+EXECUTION_MODE = os.getenv("PROCTOR_EXECUTION_MODE", "inline").strip().lower()
+BATCH_MAX_SIZE = int(os.getenv("PROCTOR_BATCH_MAX_SIZE", "16"))
+BATCH_MAX_WAIT_MS = float(os.getenv("PROCTOR_BATCH_MAX_WAIT_MS", "25"))
+BATCH_WORKERS = int(os.getenv("PROCTOR_BATCH_WORKERS", "1"))
+ANALYZE_TIMEOUT_S = float(os.getenv("PROCTOR_ANALYZE_TIMEOUT_S", "10"))
+PROCESS_WORKERS = int(os.getenv("PROCTOR_PROCESS_WORKERS", str(os.cpu_count() or 1)))
+# Per-session frame reuse and phone-check gating, see proctor_ai/temporal.py.
+TEMPORAL_ENABLED = os.getenv("PROCTOR_TEMPORAL", "0") == "1"
+
+
+class AnalyzerUnavailable(RuntimeError):
+    pass
+
+
+_MODEL_MODULES = ("proctor_ai.face_module", "proctor_ai.gaze_module", "proctor_ai.phone_module")
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+_process_pool = None
+_process_pool_lock = threading.Lock()
+
+
+def get_scheduler():
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from proctor_ai.batch_scheduler import InferenceScheduler
+                from proctor_ai.violation_engine import analyze_batch
+
+                _scheduler = InferenceScheduler(
+                    analyze_batch,
+                    max_batch_size=BATCH_MAX_SIZE,
+                    max_wait_ms=BATCH_MAX_WAIT_MS,
+                    workers=BATCH_WORKERS,
+                )
+                _scheduler.start()
+    return _scheduler
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        with _process_pool_lock:
+            if _process_pool is None:
+                from proctor_ai.process_pool import ProcessAnalyzerPool
+
+                _process_pool = ProcessAnalyzerPool(size=PROCESS_WORKERS)
+    return _process_pool
+
+
+def decode_jpeg(buffer):
+    import cv2
+    import numpy as np
+
+    if not buffer:
+        return None
+    # frombuffer wraps the request bytes without copying; imdecode writes the
+    # decoded pixels straight into a new array.
+    with metrics.stage("imdecode"):
+        return cv2.imdecode(np.frombuffer(buffer, dtype=np.uint8), cv2.IMREAD_COLOR)
+
+
+def _dispatch(image_bgr, enable_phone):
+    if EXECUTION_MODE == "process":
+        return get_process_pool().analyze(image_bgr, enable_phone, timeout=ANALYZE_TIMEOUT_S)
+    if EXECUTION_MODE == "batch":
+        return get_scheduler().analyze(image_bgr, enable_phone, timeout=ANALYZE_TIMEOUT_S)
+
+    from proctor_ai.violation_engine import analyze_frame
+
+    return analyze_frame(image_bgr, enable_phone=enable_phone)
+
+
+FRAMES = metrics.counter("proctor_frames_total", "Frames submitted for analysis.", ("mode",))
+
+
+def analyze(image_bgr, enable_phone=True, session_id=None, motion=None):
+    FRAMES.inc(EXECUTION_MODE)
+    with metrics.stage("analyze"):
+        if TEMPORAL_ENABLED and session_id is not None:
+            from proctor_ai.temporal import gate
+
+            return gate.analyze(session_id, image_bgr, enable_phone, motion, _dispatch)
+        return _dispatch(image_bgr, enable_phone)
+
+
+def forget_session(session_id):
+    # Drops the temporal gate's per-session state once a session ends.
+    if "proctor_ai.temporal" in sys.modules:
+        sys.modules["proctor_ai.temporal"].gate.forget(session_id)
+
+
+metrics.gauge(
+    "proctor_batch_queue_depth",
+    "Frames waiting for the batch scheduler.",
+    lambda: _scheduler.queue_depth() if _scheduler is not None else None,
+)
+
+
+def stats():
+    data = {"mode": EXECUTION_MODE}
+    if _scheduler is not None:
+        data["batch"] = _scheduler.stats()
+    if _process_pool is not None:
+        data["process"] = _process_pool.stats()
+    if "proctor_ai.temporal" in sys.modules:
+        gate = sys.modules["proctor_ai.temporal"].gate
+        data["temporal"] = dict(gate.stats, sessions=gate.session_count())
+    # Only report pools that are already loaded; stats must not import models.
+    data["pools"] = [sys.modules[name].pool_stats() for name in _MODEL_MODULES if name in sys.modules]
+    return data
+
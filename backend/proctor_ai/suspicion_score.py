@@ -5,5 +5,8 @@ def calculate_suspicion(violations):
         "phone_detected": 3,
         "gaze_left": 1,
         "gaze_right": 1,
+        "head_left": 1,
+        "head_right": 1,
+        "head_down": 1,
     }
     return sum(score_map.get(v, 1) for v in violations)
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+
+import cv2
+
+
+# Frames whose 32x24 grayscale thumbnail differs from the last analyzed one by
+# less than REUSE_DIFF (mean absolute difference, 0-255) reuse its verdict.
+REUSE_DIFF = float(os.getenv("PROCTOR_TEMPORAL_REUSE_DIFF", "3.0"))
+# Client-side motion score (proctor.js detectMinuteMovement) that forces a run.
+MOTION_THRESHOLD = float(os.getenv("PROCTOR_TEMPORAL_MOTION", "6.0"))
+# Never reuse more than this many frames in a row.
+MAX_REUSE = int(os.getenv("PROCTOR_TEMPORAL_MAX_REUSE", "4"))
+# Run the phone detector at least every Nth analyzed frame.
+PHONE_EVERY_N = int(os.getenv("PROCTOR_TEMPORAL_PHONE_EVERY", "4"))
+SESSION_TTL_S = float(os.getenv("PROCTOR_TEMPORAL_TTL_S", "900"))
+
+THUMB_SIZE = (32, 24)
+
+
+def _thumbnail(image_bgr):
+    gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
+    return cv2.resize(gray, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def _face_state(violations):
+    if "no_face" in violations:
+        return "none"
+    if "multiple_faces" in violations:
+        return "multiple"
+    return "single"
+
+
+class _SessionState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thumb = None
+        self.verdict = None
+        self.face_state = None
+        self.reused = 0
+        # Start due so the first analyzed frame of a session checks for phones.
+        self.since_phone = PHONE_EVERY_N
+        self.phone_hit = False
+        self.force_phone = False
+        self.updated_at = time.monotonic()
+
+
+class TemporalGate:
+    """Per-session frame skipping in front of a stateless analyzer.
+
+    ``analyze`` is called as ``analyze(image_bgr, enable_phone)`` and must
+    return ``(violations, score)``.
+    """
+
+    def __init__(self):
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._last_purge = time.monotonic()
+        self.stats = {"frames": 0, "reused": 0, "phone_runs": 0, "phone_skipped": 0}
+
+    def _state(self, session_id):
+        now = time.monotonic()
+        with self._lock:
+            if now - self._last_purge > 60:
+                self._last_purge = now
+                for key in [k for k, s in self._sessions.items() if now - s.updated_at > SESSION_TTL_S]:
+                    del self._sessions[key]
+            state = self._sessions.get(session_id)
+            if state is None:
+                state = self._sessions[session_id] = _SessionState()
+            state.updated_at = now
+            return state
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def forget(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def analyze(self, session_id, image_bgr, enable_phone, motion, analyze):
+        thumb = _thumbnail(image_bgr)
+        state = self._state(session_id)
+        moving = motion is not None and motion >= MOTION_THRESHOLD
+
+        with state.lock:
+            self._count("frames")
+            if (
+                state.verdict is not None
+                and not moving
+                and state.reused < MAX_REUSE
+                and float(cv2.absdiff(thumb, state.thumb).mean()) < REUSE_DIFF
+            ):
+                state.reused += 1
+                self._count("reused")
+                return state.verdict
+
+            # The phone check is the expensive stage: run it on a fixed cadence,
+            # on motion, after a face-count change, and while a phone is in view.
+            run_phone = enable_phone and (
+                moving
+                or state.force_phone
+                or state.phone_hit
+                or state.since_phone + 1 >= PHONE_EVERY_N
+            )
+            verdict = analyze(image_bgr, run_phone)
+            violations = verdict[0]
+
+            face_state = _face_state(violations)
+            state.force_phone = state.face_state is not None and face_state != state.face_state
+            state.face_state = face_state
+            if run_phone:
+                self._count("phone_runs")
+                state.since_phone = 0
+                state.phone_hit = "phone_detected" in violations
+            else:
+                self._count("phone_skipped")
+                state.since_phone += 1
+
+            state.thumb = thumb
+            state.verdict = verdict
+            state.reused = 0
+            return verdict
+
+    def session_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+
+gate = TemporalGate()
@@ -1,24 +1,53 @@
-from proctor_ai.face_module import count_faces
-from proctor_ai.gaze_module import estimate_gaze
-from proctor_ai.phone_module import detect_phone
+from proctor_ai import metrics
+from proctor_ai.face_analysis import analyze_faces
+from proctor_ai.phone_module import detect_phone_batch
 from proctor_ai.suspicion_score import calculate_suspicion
 
 
-def analyze_frame(image_bgr, enable_phone=True):
+DETECTED = metrics.counter(
+    "proctor_detected_violations_total", "Violations found by frame analysis.", ("type",)
+)
+
+
+def _face_violations(image_bgr):
     violations = []
+    faces = analyze_faces(image_bgr)
 
-    faces = count_faces(image_bgr)
-    if faces == 0:
+    if faces.face_count == 0:
         violations.append("no_face")
-    if faces > 1:
+    if faces.face_count > 1:
         violations.append("multiple_faces")
 
-    gaze = estimate_gaze(image_bgr)
-    if gaze in {"left", "right"}:
-        violations.append(f"gaze_{gaze}")
+    if faces.gaze in {"left", "right"}:
+        violations.append(f"gaze_{faces.gaze}")
+
+    if faces.headpose in {"left", "right", "down"}:
+        violations.append(f"head_{faces.headpose}")
+
+    return violations, faces.face_boxes
+
+
+def analyze_frame(image_bgr, enable_phone=True):
+    return analyze_batch([image_bgr], [enable_phone])[0]
+
+
+def analyze_batch(images_bgr, enable_phone_flags):
+    face_results = [_face_violations(image_bgr) for image_bgr in images_bgr]
+    per_frame = [violations for violations, _ in face_results]
+
+    # One YOLO call for every frame in the batch that asked for phone detection;
+    # face boxes let the phone stage crop to the region around each face.
+    phone_indexes = [i for i, enabled in enumerate(enable_phone_flags) if enabled]
+    phone_hits = detect_phone_batch(
+        [images_bgr[i] for i in phone_indexes],
+        [face_results[i][1] for i in phone_indexes],
+    )
+    for index, hit in zip(phone_indexes, phone_hits):
+        if hit:
+            per_frame[index].append("phone_detected")
 
-    if enable_phone and detect_phone(image_bgr):
-        violations.append("phone_detected")
+    for violations in per_frame:
+        for violation in violations:
+            DETECTED.inc(violation)
 
-    score = calculate_suspicion(violations)
-    return violations, score
+    return [(violations, calculate_suspicion(violations)) for violations in per_frame]
@@ -0,0 +1,148 @@
+import atexit
+import os
+
+import database as db
+import risk
+from proctor_ai import metrics
+from snapshots import SnapshotWriter
+from write_behind import utc_now, writer
+
+DB = "proctoring.db"
+
+SEVERE_TYPES = {
+    "phone_detected",
+    "multiple_faces",
+    "no_face",
+    "permissions_blocked",
+    "fullscreen_exit",
+    "fullscreen_denied",
+    "tab_hidden",
+    "window_blur",
+    "notes_detected",
+    "book_detected",
+    "paper_detected",
+}
+
+
+# One presence row per (user, exam_code); heartbeats update it in place.
+# PROCTOR_PRESENCE_HISTORY=1 additionally keeps a rolling proctor_health log
+# with at most one row per session per flush, pruned after the retention window.
+PRESENCE_HISTORY = os.getenv("PROCTOR_PRESENCE_HISTORY", "0") == "1"
+PRESENCE_HISTORY_S = int(os.getenv("PROCTOR_PRESENCE_HISTORY_S", "3600"))
+STALE_AFTER_S = 30
+
+
+def _write_heartbeats(cur, rows):
+    sessions = {}
+    for user, exam_code, seen in rows:
+        first, last, count = sessions.get((user, exam_code), (seen, seen, 0))
+        sessions[(user, exam_code)] = (min(first, seen), max(last, seen), count + 1)
+
+    cur.executemany(
+        """
+        INSERT INTO proctor_presence(user, exam_code, first_seen, last_seen, heartbeats)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user, exam_code) DO UPDATE SET
+            last_seen = excluded.last_seen,
+            heartbeats = proctor_presence.heartbeats + excluded.heartbeats
+        """,
+        [(user, exam_code, first, last, count) for (user, exam_code), (first, last, count) in sessions.items()],
+    )
+
+    if PRESENCE_HISTORY:
+        cur.executemany(
+            "INSERT INTO proctor_health(user, exam_code, last_seen) VALUES (?, ?, ?)",
+            [(user, exam_code, last) for (user, exam_code), (_first, last, _count) in sessions.items()],
+        )
+        cur.execute("DELETE FROM proctor_health WHERE last_seen < ?", (utc_now(-PRESENCE_HISTORY_S),))
+
+
+def _write_violations(cur, rows):
+    cur.executemany(
+        """
+        INSERT INTO violations(user, exam_code, type, screenshot_path, timestamp)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        rows,
+    )
+    risk.apply_violations(cur, rows)
+
+
+# Heartbeats and violations are buffered and written in batches; the
+# timestamp is taken here so rows keep the time the event was received.
+writer.register("heartbeat", _write_heartbeats)
+writer.register("violation", _write_violations)
+writer.register(
+    "snapshot",
+    """
+    INSERT INTO snapshots(sha256, phash, path, user, exam_code, bytes, width, height, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """,
+)
+
+
+HEARTBEATS = metrics.counter("proctor_heartbeats_total", "Heartbeats received.")
+VIOLATIONS = metrics.counter("proctor_violations_recorded_total", "Violations reported by clients.", ("type",))
+
+
+# Shared by the HTTP routes and the streaming channel.
+def record_heartbeat(user, exam_code):
+    HEARTBEATS.inc()
+    # Students heartbeat before picking an exam; key those rows on "" like
+    # risk_scores does, since proctor_presence.exam_code is NOT NULL.
+    writer.enqueue("heartbeat", (user, exam_code or "", utc_now()))
+
+
+def _enqueue_violation(user, exam_code, violation_type, screenshot_path, timestamp):
+    writer.enqueue("violation", (user, exam_code, violation_type, screenshot_path, timestamp))
+
+
+snapshot_writer = SnapshotWriter(_enqueue_violation)
+# Registered after the write-behind queue, so at exit it drains first and the
+# violation rows it produces still get flushed.
+atexit.register(snapshot_writer.stop)
+metrics.gauge(
+    "proctor_snapshot_queue_depth",
+    "Screenshots waiting for the snapshot writer.",
+    lambda: snapshot_writer.stats()["queue_depth"],
+)
+
+
+def record_violation(user, exam_code, violation_type, screenshot_data, static_folder):
+    VIOLATIONS.inc(violation_type)
+    if screenshot_data and violation_type in SEVERE_TYPES:
+        snapshot_writer.submit(user, exam_code, violation_type, screenshot_data, static_folder, utc_now())
+    else:
+        _enqueue_violation(user, exam_code, violation_type, None, utc_now())
+
+
+def list_presence(exam_code=None, stale_after_s=STALE_AFTER_S):
+    cutoff = utc_now(-stale_after_s)
+    query = """
+        SELECT user, exam_code, first_seen, last_seen, heartbeats,
+               CASE WHEN last_seen >= ? THEN 'live' ELSE 'stale' END
+        FROM proctor_presence
+    """
+    params = [cutoff]
+    if exam_code:
+        query += " WHERE exam_code = ?"
+        params.append(exam_code)
+    query += " ORDER BY last_seen DESC"
+
+    conn = db.connect(DB)
+    cur = conn.cursor()
+    cur.execute(query, params)
+    rows = cur.fetchall()
+    conn.close()
+
+    return [
+        {
+            "user": user,
+            "exam_code": code,
+            "first_seen": str(first_seen),
+            "last_seen": str(last_seen),
+            "heartbeats": heartbeats,
+            "status": status,
+        }
+        for user, code, first_seen, last_seen, heartbeats, status in rows
+    ]
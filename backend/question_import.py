@@ -0,0 +1,180 @@
+import csv
+import io
+import json
+import math
+import os
+
+try:
+    import openpyxl
+except Exception:  # pragma: no cover - optional dependency at runtime
+    openpyxl = None
+
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+REQUIRED_FIELDS = ("question", "option1", "option2", "option3", "option4", "answer")
+SUPPORTED_EXTENSIONS = (".csv", ".jsonl", ".xlsx")
+
+_INSERT = """
+    INSERT INTO questions(question, option1, option2, option3, option4, answer, exam_code, weight, partial_credit)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+
+class ImportFormatError(ValueError):
+    pass
+
+
+def _text(stream):
+    # Decode incrementally; utf-8-sig drops the BOM Excel puts on CSV exports.
+    return io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+
+
+def _check_headers(fieldnames):
+    missing = [field for field in REQUIRED_FIELDS if field not in (fieldnames or ())]
+    if missing:
+        raise ImportFormatError(f"Missing headers: {', '.join(missing)}.")
+
+
+def _csv_rows(stream):
+    reader = csv.DictReader(_text(stream))
+    _check_headers(reader.fieldnames)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _jsonl_rows(stream):
+    for line_num, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as exc:
+            yield line_num, ValueError(f"invalid JSON ({exc.msg})")
+            continue
+        if not isinstance(row, dict):
+            yield line_num, ValueError("expected a JSON object")
+            continue
+        yield line_num, row
+
+
+def _xlsx_rows(stream):
+    if openpyxl is None:
+        raise ImportFormatError("XLSX uploads need openpyxl installed.")
+    workbook = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        fieldnames = [str(cell).strip() if cell is not None else "" for cell in header or ()]
+        _check_headers(fieldnames)
+        for line_num, values in enumerate(rows, start=2):
+            yield line_num, dict(zip(fieldnames, values))
+    finally:
+        workbook.close()
+
+
+_READERS = {".csv": _csv_rows, ".jsonl": _jsonl_rows, ".xlsx": _xlsx_rows}
+
+
+def _cell(row, field):
+    value = row.get(field)
+    return "" if value is None else str(value).strip()
+
+
+def _check_partial_credit(credit):
+    # {"option": fraction of the weight earned}, fractions between 0 and 1.
+    if not isinstance(credit, dict):
+        raise ValueError("partial_credit must be a JSON object")
+    checked = {}
+    for option, fraction in credit.items():
+        if isinstance(fraction, bool) or not isinstance(fraction, (int, float)) or not 0 <= fraction <= 1:
+            raise ValueError(f"partial_credit for {option!r} must be a number between 0 and 1")
+        checked[str(option)] = float(fraction)
+    return checked
+
+
+def _validate(row, exam_code):
+    values = {field: _cell(row, field) for field in REQUIRED_FIELDS}
+    empty = [field for field, value in values.items() if not value]
+    if empty:
+        raise ValueError(f"missing {', '.join(empty)}")
+
+    options = [values["option1"], values["option2"], values["option3"], values["option4"]]
+    if values["answer"] not in options:
+        raise ValueError("answer does not match any option")
+
+    weight = _cell(row, "weight") or "1"
+    try:
+        weight = float(weight)
+    except ValueError:
+        raise ValueError(f"weight {weight!r} is not a number")
+    if not math.isfinite(weight) or weight <= 0:
+        raise ValueError(f"weight {weight!r} must be a positive number")
+
+    partial_credit = row.get("partial_credit") or None
+    if partial_credit is not None and not isinstance(partial_credit, dict):
+        partial_credit = str(partial_credit).strip() or None
+        if partial_credit is not None:
+            try:
+                partial_credit = json.loads(partial_credit)
+            except ValueError:
+                raise ValueError("partial_credit is not valid JSON")
+    if partial_credit is not None:
+        partial_credit = json.dumps(_check_partial_credit(partial_credit))
+
+    return (
+        values["question"],
+        values["option1"],
+        values["option2"],
+        values["option3"],
+        values["option4"],
+        values["answer"],
+        exam_code,
+        weight,
+        partial_credit,
+    )
+
+
+def import_questions(cur, stream, filename, exam_code, chunk_size=CHUNK_SIZE):
+    """Insert the questions in an uploaded file in chunks through ``cur``.
+
+    Blank rows are skipped; invalid rows are reported as ``(line, message)``
+    and do not stop the import. The caller owns the transaction. Raises
+    ImportFormatError when the file as a whole cannot be read.
+    """
+    extension = os.path.splitext(filename.lower())[1]
+    reader = _READERS.get(extension)
+    if reader is None:
+        raise ImportFormatError(f"Unsupported file type. Use {', '.join(SUPPORTED_EXTENSIONS)}.")
+
+    added = 0
+    errors = []
+    chunk = []
+    for line_num, row in reader(stream):
+        if isinstance(row, Exception):
+            errors.append((line_num, str(row)))
+            continue
+        if not any(_cell(row, field) for field in REQUIRED_FIELDS):
+            continue
+        try:
+            chunk.append(_validate(row, exam_code))
+        except ValueError as exc:
+            errors.append((line_num, str(exc)))
+            continue
+        if len(chunk) >= chunk_size:
+            cur.executemany(_INSERT, chunk)
+            added += len(chunk)
+            chunk = []
+
+    if chunk:
+        cur.executemany(_INSERT, chunk)
+        added += len(chunk)
+
+    return added, errors
+
+
+def summarize_errors(errors):
+    shown = "; ".join(f"line {line}: {message}" for line, message in errors[:MAX_REPORTED_ERRORS])
+    if len(errors) > MAX_REPORTED_ERRORS:
+        shown += f"; and {len(errors) - MAX_REPORTED_ERRORS} more"
+    return shown
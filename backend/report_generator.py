@@ -0,0 +1,294 @@
+import hashlib
+import io
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+import database as db
+from snapshots import thumbnail_url
+from storage import get_storage, key_from_url
+
+logger = logging.getLogger(__name__)
+
+DB = "proctoring.db"
+
+# PDFs are built on a small worker pool, off the request threads, and cached
+# on disk under a key derived from the rows they summarize: asking again for
+# an unchanged student or exam returns the finished file immediately.
+REPORT_WORKERS = int(os.getenv("PROCTOR_REPORT_WORKERS", "2"))
+REPORT_DIR = os.getenv("PROCTOR_REPORT_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "reports"))
+MAX_THUMBNAILS = int(os.getenv("PROCTOR_REPORT_MAX_THUMBNAILS", "200"))
+# Finished and failed jobs remembered in memory; the oldest are forgotten
+# first. A forgotten report that is still on disk is found again by status().
+MAX_JOBS = int(os.getenv("PROCTOR_REPORT_MAX_JOBS", "500"))
+# Bump when the layout changes so cached PDFs are rebuilt.
+REPORT_VERSION = 1
+
+SCOPES = ("student", "exam")
+_REPORT_ID = re.compile(r"(student|exam)-[A-Za-z0-9_-]+-[0-9a-f]{24}")
+
+
+def _fingerprint(cur, scope, name):
+    # Cheap aggregates that change whenever a row the report shows changes.
+    column = "user" if scope == "student" else "exam_code"
+    cur.execute(f"SELECT COUNT(*), MAX(id) FROM violations WHERE {column} = ?", (name,))
+    violations = cur.fetchone()
+    cur.execute(f"SELECT COUNT(*), MAX(id), SUM(score) FROM exam_attempts WHERE {column} = ?", (name,))
+    attempts = cur.fetchone()
+    cur.execute(f"SELECT SUM(score), MAX(updated_at) FROM risk_scores WHERE {column} = ?", (name,))
+    scores = cur.fetchone()
+    source = repr((REPORT_VERSION, scope, name, tuple(violations), tuple(attempts), tuple(scores)))
+    return hashlib.sha256(source.encode()).hexdigest()[:24]
+
+
+def _report_prefix(scope, name):
+    # ASCII only, to match _REPORT_ID: str.isalnum() also accepts "é" or "张".
+    # Names that sanitize alike ("José", "Jos_") are told apart by a hash of
+    # the raw name, so one never replaces the other's cached PDF.
+    safe = "".join(ch if (ch.isascii() and ch.isalnum()) or ch in "-_" else "_" for ch in name)
+    digest = hashlib.sha256(name.encode()).hexdigest()[:8]
+    return f"{scope}-{safe}-{digest}-"
+
+
+def _report_id(scope, name, fingerprint):
+    return _report_prefix(scope, name) + fingerprint
+
+
+def _report_path(report_id):
+    return os.path.join(REPORT_DIR, f"{report_id}.pdf")
+
+
+def _load(cur, scope, name):
+    column = "user" if scope == "student" else "exam_code"
+    cur.execute(
+        f"""
+        SELECT exam_attempts.user, exam_attempts.exam_code, exams.title, exam_attempts.score, exam_attempts.timestamp
+        FROM exam_attempts
+        LEFT JOIN exams ON exam_attempts.exam_code = exams.exam_code
+        WHERE exam_attempts.{column} = ?
+        ORDER BY exam_attempts.user, exam_attempts.timestamp
+        """,
+        (name,),
+    )
+    attempts = cur.fetchall()
+    cur.execute(
+        f"""
+        SELECT user, exam_code, type, timestamp, screenshot_path
+        FROM violations
+        WHERE {column} = ?
+        ORDER BY user, timestamp
+        """,
+        (name,),
+    )
+    violations = cur.fetchall()
+    cur.execute(
+        f"SELECT user, exam_code, score, violations FROM risk_scores WHERE {column} = ? ORDER BY score DESC",
+        (name,),
+    )
+    scores = cur.fetchall()
+    title = name
+    if scope == "exam":
+        cur.execute("SELECT title FROM exams WHERE exam_code = ?", (name,))
+        row = cur.fetchone()
+        if row and row[0]:
+            title = f"{name} — {row[0]}"
+    return title, attempts, violations, scores
+
+
+def _thumbnail(storage, url, width):
+    from reportlab.platypus import Image
+
+    key = key_from_url(thumbnail_url(url))
+    if key is None:
+        return None
+    try:
+        data = storage.read(key)
+    except Exception:
+        return None
+    image = Image(io.BytesIO(data))
+    scale = width / float(image.imageWidth or width)
+    image.drawWidth = width
+    image.drawHeight = (image.imageHeight or width) * scale
+    return image
+
+
+def build_pdf(path, scope, title, attempts, violations, scores, storage, progress=None):
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+    styles = getSampleStyleSheet()
+    table_style = TableStyle(
+        [
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f2937")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+            ("FONTSIZE", (0, 0), (-1, -1), 8),
+            ("GRID", (0, 0), (-1, -1), 0.25, colors.HexColor("#d1d5db")),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ]
+    )
+
+    story = [
+        # Paragraph text is reportlab markup; usernames and titles are not.
+        Paragraph(f"Proctoring report: {escape(title)}", styles["Title"]),
+        Paragraph(f"{scope.title()} report generated {time.strftime('%Y-%m-%d %H:%M')}", styles["Normal"]),
+        Spacer(1, 6 * mm),
+        Paragraph("Risk scores", styles["Heading2"]),
+    ]
+    story.append(
+        Table(
+            [["Student", "Exam", "Risk score", "Violations"]] + [list(row) for row in scores],
+            style=table_style,
+            repeatRows=1,
+        )
+    )
+
+    story += [Spacer(1, 6 * mm), Paragraph("Exam attempts", styles["Heading2"])]
+    story.append(
+        Table(
+            [["Student", "Exam", "Title", "Score", "Submitted"]]
+            + [[user, code, exam_title or "", score, str(stamp)] for user, code, exam_title, score, stamp in attempts],
+            style=table_style,
+            repeatRows=1,
+        )
+    )
+
+    story += [Spacer(1, 6 * mm), Paragraph("Violation timeline", styles["Heading2"])]
+    rows = [["Time", "Student", "Exam", "Type", "Snapshot"]]
+    thumbnails = 0
+    total = max(1, len(violations))
+    for index, (user, code, violation_type, stamp, screenshot) in enumerate(violations):
+        image = None
+        if screenshot and thumbnails < MAX_THUMBNAILS:
+            image = _thumbnail(storage, screenshot, 30 * mm)
+            thumbnails += image is not None
+        rows.append([str(stamp), user, code or "", violation_type, image or ("stored" if screenshot else "")])
+        if progress is not None and index % 50 == 0:
+            progress(0.2 + 0.6 * index / total)
+    story.append(Table(rows, style=table_style, repeatRows=1))
+
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        SimpleDocTemplate(tmp_path, pagesize=A4, title=f"Proctoring report: {title}").build(story)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ReportJobs:
+    def __init__(self, workers=REPORT_WORKERS):
+        self._executor = None
+        self._workers = workers
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="report")
+            return self._executor
+
+    def submit(self, scope, name, static_folder):
+        if scope not in SCOPES:
+            raise ValueError(f"scope must be one of {', '.join(SCOPES)}")
+
+        conn = db.connect(DB)
+        try:
+            report_id = _report_id(scope, name, _fingerprint(conn.cursor(), scope, name))
+        finally:
+            conn.close()
+
+        with self._lock:
+            job = self._jobs.get(report_id)
+            if job is not None and job["status"] != "failed":
+                return self._status(report_id, job)
+            if os.path.exists(_report_path(report_id)):
+                job = self._jobs[report_id] = {"status": "done", "progress": 1.0, "cached": True, "error": None}
+                self._forget_old_jobs()
+                return self._status(report_id, job)
+            job = self._jobs[report_id] = {"status": "queued", "progress": 0.0, "cached": False, "error": None}
+            self._forget_old_jobs()
+
+        self._pool().submit(self._run, report_id, job, scope, name, static_folder)
+        return self._status(report_id, job)
+
+    def _run(self, report_id, job, scope, name, static_folder):
+        def progress(fraction):
+            job["progress"] = round(min(fraction, 0.99), 2)
+
+        try:
+            job["status"] = "running"
+            conn = db.connect(DB)
+            try:
+                title, attempts, violations, scores = _load(conn.cursor(), scope, name)
+            finally:
+                conn.close()
+            progress(0.2)
+            os.makedirs(REPORT_DIR, exist_ok=True)
+            build_pdf(
+                _report_path(report_id), scope, title, attempts, violations, scores,
+                get_storage(static_folder), progress,
+            )
+            job["progress"] = 1.0
+            job["status"] = "done"
+            self._remove_superseded(report_id, scope, name)
+        except Exception as exc:
+            logger.exception("report %s failed", report_id)
+            job["status"] = "failed"
+            job["error"] = str(exc)
+
+    def _forget_old_jobs(self):
+        # Caller holds _lock. dicts keep insertion order, so oldest come first.
+        finished = [key for key, job in self._jobs.items() if job["status"] in ("done", "failed")]
+        for key in finished[: max(0, len(self._jobs) - MAX_JOBS)]:
+            del self._jobs[key]
+
+    def _remove_superseded(self, report_id, scope, name):
+        # Each new violation or attempt changes the fingerprint; keep only the
+        # newest PDF per student or exam.
+        pattern = re.compile(re.escape(_report_prefix(scope, name)) + r"[0-9a-f]{24}\.pdf")
+        for filename in os.listdir(REPORT_DIR):
+            old_id = filename[:-4]
+            if old_id == report_id or not pattern.fullmatch(filename):
+                continue
+            with self._lock:
+                job = self._jobs.get(old_id)
+                if job is not None and job["status"] not in ("done", "failed"):
+                    continue
+                self._jobs.pop(old_id, None)
+            try:
+                os.remove(os.path.join(REPORT_DIR, filename))
+            except OSError:
+                pass
+
+    def _status(self, report_id, job):
+        return {"id": report_id, **job}
+
+    def status(self, report_id):
+        if not _REPORT_ID.fullmatch(report_id):
+            return None
+        with self._lock:
+            job = self._jobs.get(report_id)
+        if job is not None:
+            return self._status(report_id, job)
+        # Finished by another worker process, or before a restart.
+        if os.path.exists(_report_path(report_id)):
+            return {"id": report_id, "status": "done", "progress": 1.0, "cached": True, "error": None}
+        return None
+
+    def path(self, report_id):
+        status = self.status(report_id)
+        if status is None or status["status"] != "done":
+            return None
+        return _report_path(report_id)
+
+
+jobs = ReportJobs()
@@ -0,0 +1,99 @@
+import database as db
+from write_behind import utc_now
+
+DB = "proctoring.db"
+
+# Risk scoring aligned to weighted suspicious action categories.
+SEVERITY_MAP = {
+    # Face absence: No face detected > 5 sec
+    "no_face": 15,
+
+    # Eye/head movement: Looking away repeatedly
+    "gaze_left": 5,
+    "gaze_right": 5,
+    "head_left": 5,
+    "head_right": 5,
+    "head_down": 5,
+
+    # Multiple persons: Multiple faces detected
+    "multiple_faces": 25,
+
+    # Camera tampering: Camera blocked/covered or denied
+    "permissions_blocked": 20,
+    "fullscreen_denied": 20,
+
+    # Tab switching: Leaving exam window
+    "tab_hidden": 15,
+
+    # External apps: Opening new software / moving focus outside exam
+    "window_blur": 20,
+    "fullscreen_exit": 20,
+
+    # Phone detection: Mobile phone visible
+    "phone_detected": 30,
+
+    # Notes detection: Book/paper seen (future/optional detectors)
+    "notes_detected": 25,
+    "book_detected": 25,
+    "paper_detected": 25,
+
+    # Audio anomaly: Background voice/noise
+    "audio_noise": 10,
+}
+DEFAULT_SEVERITY = 1
+
+_UPSERT = """
+    INSERT INTO risk_scores(user, exam_code, score, violations, updated_at)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT (user, exam_code) DO UPDATE SET
+        score = risk_scores.score + excluded.score,
+        violations = risk_scores.violations + excluded.violations,
+        updated_at = excluded.updated_at
+"""
+
+
+def severity(violation_type):
+    return SEVERITY_MAP.get(violation_type, DEFAULT_SEVERITY)
+
+
+def _totals(rows):
+    # rows: (user, exam_code, type, count)
+    totals = {}
+    for user, exam_code, violation_type, count in rows:
+        key = (user, exam_code or "")
+        score, violations = totals.get(key, (0, 0))
+        totals[key] = (score + severity(violation_type) * count, violations + count)
+    now = utc_now()
+    return [(user, exam_code, score, violations, now) for (user, exam_code), (score, violations) in totals.items()]
+
+
+# Called inside the transaction that inserts the violation rows, so the
+# aggregate never drifts from the raw table.
+def apply_violations(cur, rows):
+    cur.executemany(_UPSERT, _totals((user, exam_code, violation_type, 1) for user, exam_code, violation_type, *_ in rows))
+
+
+def rebuild(cur):
+    if db.USE_SUPABASE:
+        # Hold off concurrent violation inserts until the rebuilt totals commit.
+        cur.execute("LOCK TABLE violations IN SHARE MODE")
+    cur.execute("DELETE FROM risk_scores")
+    cur.execute("SELECT user, exam_code, type, COUNT(*) FROM violations GROUP BY user, exam_code, type")
+    cur.executemany(_UPSERT, _totals(cur.fetchall()))
+
+
+def student_scores(cur):
+    cur.execute("SELECT user, SUM(score) FROM risk_scores GROUP BY user")
+    return {user: score for user, score in cur.fetchall()}
+
+
+if __name__ == "__main__":
+    db.init_db()
+    conn = db.connect(DB)
+    cur = conn.cursor()
+    rebuild(cur)
+    conn.commit()
+    cur.execute("SELECT COUNT(*) FROM risk_scores")
+    rebuilt = cur.fetchone()[0]
+    conn.close()
+    print(f"✅ Rebuilt risk scores for {rebuilt} student/exam pairs")
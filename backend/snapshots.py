@@ -0,0 +1,288 @@
+import base64
+import binascii
+import hashlib
+import logging
+import os
+import queue
+import re
+import threading
+from collections import OrderedDict, deque
+
+import database as db
+from storage import get_storage
+from write_behind import utc_now, writer
+
+logger = logging.getLogger(__name__)
+
+DB = "proctoring.db"
+
+WORKERS = int(os.getenv("PROCTOR_SNAPSHOT_WORKERS", "1"))
+QUEUE_SIZE = int(os.getenv("PROCTOR_SNAPSHOT_QUEUE", "1000"))
+# Re-encode to at most MAX_SIDE pixels on the long edge at JPEG QUALITY.
+REENCODE = os.getenv("PROCTOR_SNAPSHOT_REENCODE", "1") == "1"
+MAX_SIDE = int(os.getenv("PROCTOR_SNAPSHOT_MAX_SIDE", "640"))
+QUALITY = int(os.getenv("PROCTOR_SNAPSHOT_QUALITY", "80"))
+# Two snapshots of the same session whose 64-bit dHashes differ in at most
+# this many bits are treated as the same scene.
+PHASH_DISTANCE = int(os.getenv("PROCTOR_SNAPSHOT_PHASH_DISTANCE", "6"))
+MAX_PER_SESSION = int(os.getenv("PROCTOR_SNAPSHOT_MAX_PER_SESSION", "50"))
+RECENT_HASHES = 32
+MAX_SESSIONS = 5000
+
+THUMB_SIDE = int(os.getenv("PROCTOR_SNAPSHOT_THUMB_SIDE", "160"))
+
+SNAPS_DIR = "violation_snaps"
+_SHARDED_SNAPSHOT = re.compile(r"/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.jpg$")
+
+
+def _thumbnail_key(key):
+    return key[: -len(".jpg")] + ".thumb.jpg"
+
+
+def thumbnail_url(url):
+    # Snapshots stored by SnapshotWriter have a thumbnail next to them; older
+    # uuid-named files do not, so they fall back to the full image.
+    if url and _SHARDED_SNAPSHOT.search(url):
+        return _thumbnail_key(url)
+    return url
+
+
+def decode_data_url(screenshot_data):
+    try:
+        return base64.b64decode(screenshot_data.split(",")[-1], validate=False)
+    except (binascii.Error, ValueError):
+        return None
+
+
+def dhash(gray):
+    import cv2
+
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def _hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+def _prepare(image_bytes):
+    # Returns (bytes to store, thumbnail bytes, perceptual hash, width,
+    # height), or None when the payload is not a decodable image.
+    import cv2
+    import numpy as np
+
+    image = cv2.imdecode(np.frombuffer(image_bytes, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+
+    height, width = image.shape[:2]
+    stored = image_bytes
+    if REENCODE:
+        scale = min(1.0, MAX_SIDE / float(max(height, width)))
+        if scale < 1.0:
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+            height, width = image.shape[:2]
+        ok, encoded = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, QUALITY])
+        if ok and len(encoded) < len(image_bytes):
+            stored = encoded.tobytes()
+
+    thumb_scale = min(1.0, THUMB_SIDE / float(max(height, width)))
+    thumb = cv2.resize(image, (max(1, int(width * thumb_scale)), max(1, int(height * thumb_scale))), interpolation=cv2.INTER_AREA)
+    ok, thumb_encoded = cv2.imencode(".jpg", thumb, [cv2.IMWRITE_JPEG_QUALITY, QUALITY])
+
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return stored, thumb_encoded.tobytes() if ok else None, dhash(gray), width, height
+
+
+class _Session:
+    __slots__ = ("hashes", "saved", "phone_saved")
+
+    def __init__(self):
+        # (phash, path) of the most recent snapshots kept for this session.
+        self.hashes = deque(maxlen=RECENT_HASHES)
+        self.saved = 0
+        self.phone_saved = None
+
+
+class SnapshotWriter:
+    """Stores violation screenshots off the request thread.
+
+    Screenshots are content addressed (sha256) under a two-level sharded
+    directory, and a snapshot that is perceptually the same as a recent one
+    from the same user and exam reuses that file. The violation row is
+    queued once its screenshot path is known.
+    """
+
+    def __init__(self, on_stored, workers=WORKERS, queue_size=QUEUE_SIZE):
+        self._on_stored = on_stored
+        self._workers = workers
+        self._jobs = queue.Queue(maxsize=queue_size)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._sessions = OrderedDict()
+        self._sessions_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "stored": 0,
+            "exact_duplicates": 0,
+            "similar_duplicates": 0,
+            "over_limit": 0,
+            "rejected": 0,
+            "queue_full": 0,
+            "bytes_in": 0,
+            "bytes_written": 0,
+        }
+
+    def _start(self):
+        with self._start_lock:
+            if self._threads:
+                return
+            for index in range(self._workers):
+                thread = threading.Thread(target=self._run, name=f"snapshot-writer-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, user, exam_code, violation_type, screenshot_data, static_folder, timestamp):
+        if not self._threads:
+            self._start()
+        job = (user, exam_code, violation_type, screenshot_data, static_folder, timestamp)
+        try:
+            self._jobs.put_nowait(job)
+        except queue.Full:
+            # Never block the request; keep the violation without its image.
+            self._count("queue_full")
+            self._on_stored(user, exam_code, violation_type, None, timestamp)
+            return
+        self._count("submitted")
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            try:
+                if job is None:
+                    return
+                user, exam_code, violation_type, screenshot_data, static_folder, timestamp = job
+                try:
+                    path = self._store(user, exam_code, violation_type, screenshot_data, static_folder)
+                except Exception:
+                    logger.exception("storing %s snapshot for %s failed", violation_type, user)
+                    path = None
+                self._on_stored(user, exam_code, violation_type, path, timestamp)
+            finally:
+                self._jobs.task_done()
+
+    def _session(self, user, exam_code):
+        key = (user, exam_code)
+        with self._sessions_lock:
+            session = self._sessions.get(key)
+            if session is None:
+                session = self._sessions[key] = _Session()
+                while len(self._sessions) > MAX_SESSIONS:
+                    self._sessions.popitem(last=False)
+            else:
+                self._sessions.move_to_end(key)
+            return session
+
+    def _store(self, user, exam_code, violation_type, screenshot_data, static_folder):
+        session = self._session(user, exam_code)
+
+        # Keep only one screenshot for phone_detected per user+exam.
+        if violation_type == "phone_detected":
+            if session.phone_saved is None:
+                session.phone_saved = _phone_screenshot_exists(user, exam_code)
+            if session.phone_saved:
+                return None
+
+        image_bytes = decode_data_url(screenshot_data)
+        if not image_bytes:
+            self._count("rejected")
+            return None
+        self._count("bytes_in", len(image_bytes))
+
+        prepared = _prepare(image_bytes)
+        if prepared is None:
+            self._count("rejected")
+            return None
+        stored, thumbnail, phash, width, height = prepared
+
+        for recent_hash, recent_path in session.hashes:
+            if _hamming(phash, recent_hash) <= PHASH_DISTANCE:
+                self._count("similar_duplicates")
+                if violation_type == "phone_detected":
+                    session.phone_saved = True
+                return recent_path
+
+        if session.saved >= MAX_PER_SESSION:
+            self._count("over_limit")
+            return None
+
+        digest = hashlib.sha256(stored).hexdigest()
+        key = f"{SNAPS_DIR}/{digest[:2]}/{digest[2:4]}/{digest}.jpg"
+        storage = get_storage(static_folder)
+        if storage.exists(key):
+            self._count("exact_duplicates")
+        else:
+            storage.put(key, stored)
+            if thumbnail is not None:
+                storage.put(_thumbnail_key(key), thumbnail)
+            self._count("stored")
+            self._count("bytes_written", len(stored))
+
+        url = storage.url(key)
+        session.hashes.append((phash, url))
+        session.saved += 1
+        if violation_type == "phone_detected":
+            session.phone_saved = True
+        self._record_metadata(digest, phash, url, user, exam_code, len(stored), width, height)
+        return url
+
+    def _record_metadata(self, digest, phash, url, user, exam_code, size, width, height):
+        writer.enqueue("snapshot", (digest, f"{phash:016x}", url, user, exam_code, size, width, height, utc_now()))
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    def drain(self):
+        if self._threads:
+            self._jobs.join()
+
+    def stop(self):
+        if not self._threads:
+            return
+        self.drain()
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join(timeout=10)
+        self._threads = []
+
+    def stats(self):
+        with self._stats_lock:
+            data = dict(self._stats)
+        data["queue_depth"] = self._jobs.qsize()
+        with self._sessions_lock:
+            data["sessions"] = len(self._sessions)
+        return data
+
+
+def _phone_screenshot_exists(user, exam_code):
+    conn = db.connect(DB)
+    cur = conn.cursor()
+    cur.execute(
+        """
+        SELECT 1
+        FROM violations
+        WHERE user = ? AND exam_code = ? AND type = 'phone_detected' AND screenshot_path IS NOT NULL
+        LIMIT 1
+        """,
+        (user, exam_code),
+    )
+    exists = cur.fetchone() is not None
+    conn.close()
+    return exists
@@ -23,6 +23,12 @@ let fullscreenEverEntered = false;
 let phoneDetectionStreak = 0;
 let movementScore = 0;
 let previousMotionFrame = null;
+let streamSocket = null;
+// Frames sent on the stream channel, by the seq the server numbers them with,
+// so a verdict's evidence is the frame it was computed from.
+let streamFrameSeq = 0;
+const streamFrames = new Map();
+const STREAM_FRAMES_KEPT = 20;
 
 const ENABLE_AUDIO_MONITORING = false;
 const MOVEMENT_PULSE_MAX = 20;
@@ -38,6 +44,9 @@ const violationCooldownMs = {
   audio_noise: 10000,
   gaze_left: 4000,
   gaze_right: 4000,
+  head_left: 4000,
+  head_right: 4000,
+  head_down: 4000,
 };
 
 function bindElements() {
@@ -92,6 +101,7 @@ async function initProctoring() {
     // Screen checks are handled in the permissions step before exam start.
     requestFullscreen();
     watchVisibilityChanges();
+    await openStreamChannel();
     startFrameAnalysis();
     startHeartbeat();
     startLivenessWatchdog();
@@ -242,7 +252,7 @@ function startFrameAnalysis() {
       canvas.width = 320;
       canvas.height = 240;
       context.drawImage(frameVideo, 0, 0, canvas.width, canvas.height);
-      const imageData = canvas.toDataURL("image/jpeg", 0.7);
+      const imageData = await canvasToJpeg(canvas, 0.7);
       latestFrameImageData = imageData;
 
       const motion = detectMinuteMovement(canvas);
@@ -250,40 +260,28 @@ function startFrameAnalysis() {
 
       const enablePhone = true;
 
-      const response = await fetch("/proctor/analyze", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ image: imageData, enable_phone: enablePhone }),
-      });
+      if (isStreamOpen() && imageData instanceof Blob) {
+        // Verdicts arrive asynchronously on the channel; skip this tick if the
+        // previous frame has not left the socket buffer yet.
+        if (streamSocket.bufferedAmount === 0) {
+          streamSocket.send(JSON.stringify({ type: "config", motion: movementScore, enable_phone: enablePhone }));
+          streamSocket.send(imageData);
+          streamFrameSeq += 1;
+          streamFrames.set(streamFrameSeq, imageData);
+          if (streamFrames.size > STREAM_FRAMES_KEPT) {
+            streamFrames.delete(streamFrames.keys().next().value);
+          }
+        }
+        return;
+      }
+
+      const response = await postFrame(imageData, enablePhone, movementScore);
 
       if (!response.ok) {
         throw new Error(`HTTP ${response.status}`);
       }
 
-      const result = await response.json();
-      lastAnalyzeSuccessAt = Date.now();
-      const resultViolations = result.violations || [];
-      const faceDetected = !resultViolations.includes("no_face");
-      updateDebug(`Analyze OK: Face=${faceDetected} | Motion=${movementScore.toFixed(1)}`);
-
-      const phoneDetected = resultViolations.includes("phone_detected");
-      if (phoneDetected) {
-        phoneDetectionStreak += 1;
-      } else {
-        phoneDetectionStreak = 0;
-      }
-
-      const filteredViolations = resultViolations.filter((type) => {
-        if (type !== "phone_detected") return true;
-        // Require repeated phone detection across consecutive frames
-        // to reduce false positives from single-frame misclassifications.
-        return phoneDetectionStreak >= 1;
-      });
-
-      if (filteredViolations.length > 0) {
-        filteredViolations.forEach((type) => reportViolation(type, imageData));
-      }
-      updateCenteringHint(filteredViolations);
+      handleAnalysisResult(await response.json(), imageData);
     } catch (err) {
       updateDebug(`Analyze FAILED ❌ ${err.message}`);
       console.error("Proctor analyze error:", err);
@@ -307,11 +305,148 @@ function startFrameAnalysis() {
   proctorLoop();
 }
 
+function handleAnalysisResult(result, imageData) {
+  lastAnalyzeSuccessAt = Date.now();
+  const resultViolations = result.violations || [];
+  const faceDetected = !resultViolations.includes("no_face");
+  updateDebug(`Analyze OK: Face=${faceDetected} | Motion=${movementScore.toFixed(1)}`);
+
+  const phoneDetected = resultViolations.includes("phone_detected");
+  if (phoneDetected) {
+    phoneDetectionStreak += 1;
+  } else {
+    phoneDetectionStreak = 0;
+  }
+
+  const filteredViolations = resultViolations.filter((type) => {
+    if (type !== "phone_detected") return true;
+    // Require repeated phone detection across consecutive frames
+    // to reduce false positives from single-frame misclassifications.
+    return phoneDetectionStreak >= 1;
+  });
+
+  if (filteredViolations.length > 0) {
+    filteredViolations.forEach((type) => reportViolation(type, imageData));
+  }
+  updateCenteringHint(filteredViolations);
+}
+
+function isStreamOpen() {
+  return streamSocket !== null && streamSocket.readyState === WebSocket.OPEN;
+}
+
+function openStreamChannel() {
+  // One socket carries frames, heartbeats and violations; if it cannot be
+  // opened (or drops later) the HTTP endpoints are used instead.
+  if (!window.WebSocket) return Promise.resolve(null);
+
+  return new Promise((resolve) => {
+    const scheme = window.location.protocol === "https:" ? "wss" : "ws";
+    let socket;
+    try {
+      socket = new WebSocket(`${scheme}://${window.location.host}/proctor/stream`);
+    } catch (_error) {
+      resolve(null);
+      return;
+    }
+
+    const timer = setTimeout(() => {
+      socket.close();
+      resolve(null);
+    }, 3000);
+
+    socket.onopen = () => {
+      clearTimeout(timer);
+      // The server numbers frames from 1 on every new channel.
+      streamFrameSeq = 0;
+      streamFrames.clear();
+      streamSocket = socket;
+      resolve(socket);
+    };
+    socket.onerror = () => {
+      clearTimeout(timer);
+      resolve(null);
+    };
+    socket.onclose = () => {
+      if (streamSocket === socket) {
+        streamSocket = null;
+      }
+    };
+    socket.onmessage = (event) => {
+      let message;
+      try {
+        message = JSON.parse(event.data);
+      } catch (_error) {
+        return;
+      }
+      const frame = takeStreamFrame(message.seq);
+      if (message.type === "verdict") {
+        handleAnalysisResult(message, frame);
+      } else if (message.type === "error") {
+        updateDebug(`Analyze FAILED ❌ ${message.error}`);
+      }
+    };
+  });
+}
+
+function takeStreamFrame(seq) {
+  // Frames up to seq have been analyzed or dropped by the server.
+  if (typeof seq !== "number") return null;
+  const frame = streamFrames.get(seq) || null;
+  for (const key of streamFrames.keys()) {
+    if (key <= seq) streamFrames.delete(key);
+  }
+  return frame;
+}
+
+function canvasToJpeg(canvas, quality) {
+  // Raw JPEG blobs avoid the base64 inflation of data URLs; older browsers
+  // without toBlob fall back to the JSON route.
+  if (!canvas.toBlob) {
+    return Promise.resolve(canvas.toDataURL("image/jpeg", quality));
+  }
+  return new Promise((resolve) => {
+    canvas.toBlob((blob) => resolve(blob || canvas.toDataURL("image/jpeg", quality)), "image/jpeg", quality);
+  });
+}
+
+function postFrame(frame, enablePhone, motion) {
+  // The motion score lets the server reuse its last verdict for still frames.
+  if (frame instanceof Blob) {
+    return fetch(`/proctor/analyze/frame?enable_phone=${enablePhone ? 1 : 0}&motion=${motion.toFixed(2)}`, {
+      method: "POST",
+      headers: { "Content-Type": "application/octet-stream" },
+      body: frame,
+    });
+  }
+  return fetch("/proctor/analyze", {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ image: frame, enable_phone: enablePhone, motion }),
+  });
+}
+
+function toDataUrl(snapshot) {
+  if (!(snapshot instanceof Blob)) {
+    return Promise.resolve(snapshot);
+  }
+  return new Promise((resolve) => {
+    const reader = new FileReader();
+    reader.onload = () => resolve(reader.result);
+    reader.onerror = () => resolve(null);
+    reader.readAsDataURL(snapshot);
+  });
+}
+
 function startHeartbeat() {
   setInterval(async () => {
     if (examStopped) return;
 
     try {
+      if (isStreamOpen()) {
+        streamSocket.send(JSON.stringify({ type: "heartbeat" }));
+        return;
+      }
       await fetch("/proctor/heartbeat", { method: "POST" });
     } catch (err) {
       console.error("Heartbeat error:", err);
@@ -487,7 +622,12 @@ async function reportViolation(type, screenshot = null) {
 
     if (isSevereViolation(type)) {
       // Capture evidence for every severe event, including every phone detection.
-      payload.screenshot = screenshot || captureViolationSnapshot(type);
+      payload.screenshot = await toDataUrl(screenshot || captureViolationSnapshot(type));
+    }
+
+    if (isStreamOpen()) {
+      streamSocket.send(JSON.stringify({ type: "violation", violation: type, screenshot: payload.screenshot }));
+      return;
     }
 
     await fetch("/proctor/violation", {
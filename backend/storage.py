@@ -0,0 +1,150 @@
+import io
+import os
+import threading
+
+try:
+    import boto3
+except Exception:  # pragma: no cover - optional dependency at runtime
+    boto3 = None
+
+# PROCTOR_STORAGE selects where snapshots live: "filesystem" (default, under
+# Flask's static folder) or "s3" for any S3-compatible service (AWS, MinIO).
+STORAGE_BACKEND = os.getenv("PROCTOR_STORAGE", "filesystem")
+S3_BUCKET = os.getenv("PROCTOR_S3_BUCKET")
+S3_PREFIX = os.getenv("PROCTOR_S3_PREFIX", "")
+S3_ENDPOINT_URL = os.getenv("PROCTOR_S3_ENDPOINT_URL")
+# Serve objects straight from this base URL (public bucket or CDN) instead of
+# redirecting through short-lived presigned URLs.
+S3_PUBLIC_URL = os.getenv("PROCTOR_S3_PUBLIC_URL")
+S3_URL_EXPIRES_S = int(os.getenv("PROCTOR_S3_URL_EXPIRES_S", "300"))
+
+# URLs stored for S3 objects point back at the app, which redirects to the
+# object; see the /snapshots/<key> route.
+S3_APP_PREFIX = "/snapshots/"
+
+
+def _reader(data):
+    return io.BytesIO(data) if isinstance(data, (bytes, bytearray, memoryview)) else data
+
+
+class FilesystemStorage:
+    name = "filesystem"
+
+    def __init__(self, root, url_prefix="/static/"):
+        self.root = root
+        self.url_prefix = url_prefix
+
+    def _path(self, key):
+        return os.path.join(self.root, *key.split("/"))
+
+    def exists(self, key):
+        return os.path.exists(self._path(key))
+
+    def put(self, key, data, content_type="image/jpeg"):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            source = _reader(data)
+            while True:
+                chunk = source.read(1 << 16)
+                if not chunk:
+                    break
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+    def read(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def url(self, key):
+        return self.url_prefix + key
+
+    def object_url(self, key):
+        return self.url(key)
+
+
+class S3Storage:
+    name = "s3"
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, public_url=None, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("PROCTOR_STORAGE=s3 needs boto3 installed.")
+            client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+        self.public_url = public_url.rstrip("/") if public_url else None
+
+    def _key(self, key):
+        return f"{self.prefix}/{key}" if self.prefix else key
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(key))
+        except self.client.exceptions.ClientError as exc:
+            if exc.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+        return True
+
+    def put(self, key, data, content_type="image/jpeg"):
+        # upload_fileobj streams in parts instead of buffering the whole body.
+        self.client.upload_fileobj(
+            _reader(data),
+            self.bucket,
+            self._key(key),
+            ExtraArgs={"ContentType": content_type},
+        )
+
+    def read(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(key))["Body"].read()
+
+    def url(self, key):
+        if self.public_url:
+            return f"{self.public_url}/{self._key(key)}"
+        return S3_APP_PREFIX + key
+
+    def object_url(self, key):
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._key(key)},
+            ExpiresIn=S3_URL_EXPIRES_S,
+        )
+
+
+def key_from_url(url):
+    # Inverse of url() for the app-relative forms stored in the database.
+    if not url:
+        return None
+    for prefix in ("/static/", S3_APP_PREFIX):
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    if S3_PUBLIC_URL:
+        prefix = S3_PUBLIC_URL.rstrip("/") + "/"
+        if S3_PREFIX.strip("/"):
+            prefix += S3_PREFIX.strip("/") + "/"
+        if url.startswith(prefix):
+            return url[len(prefix):]
+    return None
+
+
+_storage = None
+_storage_lock = threading.Lock()
+
+
+def get_storage(static_folder):
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                if STORAGE_BACKEND == "s3":
+                    if not S3_BUCKET:
+                        raise RuntimeError("PROCTOR_STORAGE=s3 needs PROCTOR_S3_BUCKET.")
+                    _storage = S3Storage(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_PUBLIC_URL)
+                elif STORAGE_BACKEND == "filesystem":
+                    _storage = FilesystemStorage(static_folder)
+                else:
+                    raise RuntimeError(f"Unknown PROCTOR_STORAGE backend: {STORAGE_BACKEND}")
+    return _storage
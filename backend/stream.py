@@ -0,0 +1,174 @@
+import json
+import logging
+import threading
+import time
+
+from flask import current_app, session
+
+from proctor_ai import runtime
+from proctoring import record_heartbeat, record_violation
+
+try:
+    from flask_sock import Sock
+except Exception:  # pragma: no cover - optional dependency at runtime
+    Sock = None
+
+logger = logging.getLogger(__name__)
+
+# Frames older than this when inference gets to them are dropped unanalyzed.
+MAX_FRAME_AGE_S = 2.0
+
+
+class _LatestFrame:
+    """Single-slot mailbox: a newer frame replaces one still waiting."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._cond.notify()
+
+    def take(self):
+        with self._cond:
+            while self._frame is None and not self._closed:
+                self._cond.wait()
+            frame, self._frame = self._frame, None
+            return frame
+
+    def drop(self):
+        with self._cond:
+            self.dropped += 1
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+
+class _Channel:
+    def __init__(self, ws, user, exam_code, static_folder):
+        self.ws = ws
+        self.user = user
+        self.exam_code = exam_code
+        self.static_folder = static_folder
+        self.enable_phone = True
+        self.motion = None
+        self.session_id = f"{user}:{exam_code}"
+        self.frames = _LatestFrame()
+        self._send_lock = threading.Lock()
+        self._seq = 0
+
+    def send(self, message):
+        with self._send_lock:
+            self.ws.send(json.dumps(message))
+
+    def analyze_loop(self):
+        while True:
+            item = self.frames.take()
+            if item is None:
+                return
+            seq, received_at, raw, enable_phone, motion = item
+            if time.monotonic() - received_at > MAX_FRAME_AGE_S:
+                self.frames.drop()
+                continue
+
+            image_bgr = runtime.decode_jpeg(raw)
+            if image_bgr is None:
+                self.send({"type": "error", "seq": seq, "error": "undecodable frame"})
+                continue
+            try:
+                violations, score = runtime.analyze(
+                    image_bgr, enable_phone=enable_phone, session_id=self.session_id, motion=motion
+                )
+            except (TimeoutError, runtime.AnalyzerUnavailable):
+                self.send({"type": "error", "seq": seq, "error": "analyzer unavailable"})
+                continue
+            except Exception:
+                # One bad frame must not silence the channel: report it and
+                # keep analyzing the frames that follow.
+                logger.exception("stream analysis failed for %s", self.session_id)
+                self.send({"type": "error", "seq": seq, "error": "analysis failed"})
+                continue
+            self.send(
+                {
+                    "type": "verdict",
+                    "seq": seq,
+                    "violations": violations,
+                    "score": score,
+                    "dropped": self.frames.dropped,
+                }
+            )
+
+    def handle_text(self, text):
+        try:
+            message = json.loads(text)
+        except ValueError:
+            return
+        if not isinstance(message, dict):
+            return
+        kind = message.get("type")
+        if kind == "heartbeat":
+            record_heartbeat(self.user, self.exam_code)
+            self.send({"type": "ack", "for": "heartbeat"})
+        elif kind == "violation":
+            record_violation(
+                self.user,
+                self.exam_code,
+                message.get("violation", "unknown"),
+                message.get("screenshot"),
+                self.static_folder,
+            )
+            self.send({"type": "ack", "for": "violation"})
+        elif kind == "config":
+            self.enable_phone = bool(message.get("enable_phone", self.enable_phone))
+            if message.get("motion") is not None:
+                try:
+                    self.motion = float(message["motion"])
+                except (TypeError, ValueError):
+                    pass
+
+    def run(self):
+        worker = threading.Thread(target=self.analyze_loop, name="proctor-stream", daemon=True)
+        worker.start()
+        try:
+            while True:
+                data = self.ws.receive()
+                if data is None:
+                    break
+                if isinstance(data, (bytes, bytearray)):
+                    self._seq += 1
+                    self.frames.put((self._seq, time.monotonic(), data, self.enable_phone, self.motion))
+                else:
+                    self.handle_text(data)
+        finally:
+            self.frames.close()
+            # Let an in-flight frame finish so it cannot recreate the state.
+            worker.join(timeout=10)
+            runtime.forget_session(self.session_id)
+
+
+def register_stream(app):
+    if Sock is None:
+        return None
+
+    sock = Sock(app)
+
+    # One long-lived channel per exam session: binary messages are JPEG frames,
+    # text messages are JSON heartbeats, violations and config updates. The
+    # session cookie is checked once, when the socket is opened.
+    @sock.route("/proctor/stream")
+    def proctor_stream(ws):
+        if "user" not in session or session.get("role") != "student":
+            ws.close(reason=1008, message="unauthorized")
+            return
+        channel = _Channel(ws, session["user"], session.get("selected_exam"), current_app.static_folder)
+        channel.run()
+
+    return sock
@@ -0,0 +1,18 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db  # noqa: E402
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    # A fresh, fully migrated SQLite database per test.
+    path = str(tmp_path / "proctoring.db")
+    conn = db.connect(path)
+    db.migrate(conn)
+    conn.close()
+    return path
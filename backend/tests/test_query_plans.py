@@ -0,0 +1,70 @@
+import pytest
+
+import database as db
+
+# The hot queries, as the app issues them, and the index each must use.
+QUERIES = {
+    "admin dashboard": (
+        """
+        SELECT users.username, COUNT(exam_attempts.id) AS attempts, MAX(exam_attempts.timestamp) AS last_attempt
+        FROM users
+        LEFT JOIN exam_attempts ON users.username = exam_attempts.user
+        WHERE users.role = 'student'
+        GROUP BY users.username
+        ORDER BY users.username
+        """,
+        (),
+        "idx_attempts_user_exam",
+    ),
+    "student detail violations": (
+        """
+        SELECT type, timestamp, screenshot_path, exam_code
+        FROM violations
+        WHERE user = ?
+        ORDER BY timestamp DESC
+        """,
+        ("stu",),
+        "idx_violations_user_timestamp",
+    ),
+    "attempt check": (
+        "SELECT 1 FROM exam_attempts WHERE user = ? AND exam_code = ? LIMIT 1",
+        ("stu", "EX1"),
+        "idx_attempts_user_exam",
+    ),
+    "phone screenshot dedup": (
+        """
+        SELECT 1
+        FROM violations
+        WHERE user = ? AND exam_code = ? AND type = 'phone_detected' AND screenshot_path IS NOT NULL
+        LIMIT 1
+        """,
+        ("stu", "EX1"),
+        "idx_violations_user_exam_type",
+    ),
+    "exam questions": (
+        "SELECT id, question FROM questions WHERE exam_code = ?",
+        ("EX1",),
+        "idx_questions_exam_code",
+    ),
+}
+
+
+def _plan(db_path, query, params):
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("EXPLAIN QUERY PLAN " + query, params)
+    plan = " | ".join(row[-1] for row in cur.fetchall())
+    conn.close()
+    return plan
+
+
+@pytest.mark.parametrize("name", sorted(QUERIES))
+def test_query_uses_index(db_path, name):
+    query, params, index = QUERIES[name]
+    plan = _plan(db_path, query, params)
+    assert index in plan, plan
+
+
+def test_student_detail_needs_no_sort(db_path):
+    query, params, _index = QUERIES["student detail violations"]
+    assert "TEMP B-TREE" not in _plan(db_path, query, params)
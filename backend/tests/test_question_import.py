@@ -0,0 +1,107 @@
+import io
+import json
+
+import pytest
+
+import database as db
+from question_import import ImportFormatError, import_questions, summarize_errors
+
+HEADER = "question,option1,option2,option3,option4,answer,weight,partial_credit\n"
+
+
+def _import(db_path, data, filename, chunk_size=1000):
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    added, errors = import_questions(cur, io.BytesIO(data), filename, "EX1", chunk_size=chunk_size)
+    conn.commit()
+    cur.execute("SELECT question, answer, exam_code, weight, partial_credit FROM questions ORDER BY id")
+    rows = cur.fetchall()
+    conn.close()
+    return added, errors, rows
+
+
+def test_csv_rows_and_row_errors(db_path):
+    data = (
+        "\ufeff" + HEADER  # Excel's BOM
+        + "Capital of France?,Paris,Rome,Oslo,Bern,Paris,2,\"{\"\"Rome\"\": 0.5}\"\n"
+        + ",,,,,,,\n"
+        + "No answer?,a,b,c,d,e,,\n"
+        + "Missing option?,a,,c,d,a,,\n"
+        + "Bad weight?,a,b,c,d,a,heavy,\n"
+        + "Sky?,Blue,Red,Green,Pink,Blue,,\n"
+    ).encode()
+
+    added, errors, rows = _import(db_path, data, "questions.CSV", chunk_size=1)
+
+    assert added == 2
+    assert rows == [
+        ("Capital of France?", "Paris", "EX1", 2.0, json.dumps({"Rome": 0.5})),
+        ("Sky?", "Blue", "EX1", 1.0, None),
+    ]
+    assert errors == [
+        (4, "answer does not match any option"),
+        (5, "missing option2"),
+        (6, "weight 'heavy' is not a number"),
+    ]
+    assert summarize_errors(errors).startswith("line 4: answer does not match any option; line 5:")
+
+
+@pytest.mark.parametrize("weight", ["nan", "inf", "-inf", "0", "-1"])
+def test_non_finite_or_non_positive_weight_is_a_row_error(db_path, weight):
+    data = (HEADER + f"Q?,a,b,c,d,a,{weight},\n").encode()
+
+    added, errors, rows = _import(db_path, data, "q.csv")
+
+    assert (added, rows) == (0, [])
+    assert len(errors) == 1 and errors[0][0] == 2
+    assert "must be a positive number" in errors[0][1]
+
+
+def test_jsonl_rows(db_path):
+    lines = [
+        {"question": "2+2?", "option1": "3", "option2": "4", "option3": "5", "option4": "6", "answer": "4",
+         "weight": 3, "partial_credit": {"5": 0.25}},
+        "{not json",
+        [1, 2],
+        "",
+        {"question": "Bad credit?", "option1": "a", "option2": "b", "option3": "c", "option4": "d",
+         "answer": "a", "partial_credit": {"b": 2}},
+    ]
+    data = "\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines).encode()
+
+    added, errors, rows = _import(db_path, data, "q.jsonl")
+
+    assert added == 1
+    assert rows == [("2+2?", "4", "EX1", 3.0, json.dumps({"5": 0.25}))]
+    assert [line for line, _message in errors] == [2, 3, 5]
+    assert errors[0][1].startswith("invalid JSON")
+    assert errors[1][1] == "expected a JSON object"
+    assert errors[2][1] == "partial_credit for 'b' must be a number between 0 and 1"
+
+
+def test_xlsx_rows(db_path):
+    openpyxl = pytest.importorskip("openpyxl")
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(HEADER.strip().split(","))
+    sheet.append(["Largest planet?", "Mars", "Jupiter", "Venus", "Earth", "Jupiter", 1.5, None])
+    sheet.append(["Numeric options?", 1, 2, 3, 4, 2, None, None])
+    sheet.append(["Bad weight?", "a", "b", "c", "d", "a", "nan", None])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+
+    added, errors, rows = _import(db_path, buffer.getvalue(), "q.xlsx")
+
+    assert added == 2
+    assert rows == [
+        ("Largest planet?", "Jupiter", "EX1", 1.5, None),
+        ("Numeric options?", "2", "EX1", 1.0, None),
+    ]
+    assert [line for line, _message in errors] == [4]
+
+
+def test_missing_headers_and_unsupported_type(db_path):
+    with pytest.raises(ImportFormatError, match="Missing headers: answer"):
+        _import(db_path, b"question,option1,option2,option3,option4\n", "q.csv")
+    with pytest.raises(ImportFormatError, match="Unsupported file type"):
+        _import(db_path, b"", "q.txt")
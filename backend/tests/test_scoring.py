@@ -0,0 +1,81 @@
+import json
+
+import pytest
+
+import database as db
+import exam_manager
+from exam_manager import calculate_score, score_submission
+
+QUESTIONS = [
+    # question, answer, weight, partial_credit
+    ("2+2?", "4", 2, None),
+    ("Capital of France?", "Paris", 1, json.dumps({"Rome": 0.5, "Paris, Texas": 0.25})),
+    ("Sky?", "Blue", 0.5, None),
+]
+
+
+@pytest.fixture
+def exam(db_path, monkeypatch):
+    monkeypatch.setattr(exam_manager, "DB", db_path)
+    exam_manager.question_cache.invalidate()
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("INSERT INTO exams(exam_code, title) VALUES ('EX1', 'Exam One')")
+    ids = []
+    for question, answer, weight, partial in QUESTIONS:
+        cur.execute(
+            """
+            INSERT INTO questions(question, option1, option2, option3, option4, answer, exam_code, weight, partial_credit)
+            VALUES (?, ?, 'a', 'b', 'c', ?, 'EX1', ?, ?)
+            """,
+            (question, answer, answer, weight, partial),
+        )
+        cur.execute("SELECT MAX(id) FROM questions")
+        ids.append(str(cur.fetchone()[0]))
+    conn.commit()
+    conn.close()
+    yield ids
+    exam_manager.question_cache.invalidate()
+
+
+def test_weighted_total_with_partial_credit_and_unknown_option(exam):
+    q1, q2, q3 = exam
+    result = score_submission({q1: "4", q2: "Rome", q3: "not an option"}, "EX1")
+
+    assert result["score"] == 2.5
+    assert result["max_score"] == 3.5
+    by_id = {str(row["question_id"]): row for row in result["breakdown"]}
+    assert (by_id[q1]["correct"], by_id[q1]["earned"]) == (True, 2.0)
+    assert (by_id[q2]["correct"], by_id[q2]["credit"], by_id[q2]["earned"]) == (False, 0.5, 0.5)
+    assert (by_id[q3]["credit"], by_id[q3]["earned"]) == (0.0, 0.0)
+
+
+def test_partial_fraction_scales_with_weight(exam):
+    q1, q2, q3 = exam
+    assert calculate_score({q2: "Paris, Texas"}, "EX1") == 0.25
+    assert calculate_score({q1: "4", q2: "Paris", q3: "Blue"}, "EX1") == 3.5
+
+
+def test_unanswered_questions_count_towards_max_score(exam):
+    q1, _q2, _q3 = exam
+    result = score_submission({q1: "4"}, "EX1")
+    assert (result["score"], result["max_score"]) == (2, 3.5)
+
+
+def test_without_exam_code_only_submitted_questions_are_scored(exam):
+    q1, q2, _q3 = exam
+    result = score_submission({q1: "5", q2: "Rome", "csrf_token": "x"})
+    assert (result["score"], result["max_score"]) == (0.5, 3)
+
+
+def test_malformed_stored_partial_credit_is_ignored(exam, db_path):
+    _q1, q2, _q3 = exam
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("UPDATE questions SET partial_credit = ? WHERE id = ?", ('{"Rome": "half", "Oslo": 0.5}', int(q2)))
+    conn.commit()
+    conn.close()
+    exam_manager.question_cache.invalidate()
+
+    assert calculate_score({q2: "Rome"}, "EX1") == 0
+    assert calculate_score({q2: "Oslo"}, "EX1") == 0.5
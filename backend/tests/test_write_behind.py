@@ -0,0 +1,73 @@
+import database as db
+import proctoring
+from write_behind import WriteBehindQueue, utc_now
+
+
+def _queue(db_path):
+    queue = WriteBehindQueue(db_name=db_path, flush_interval_s=3600)
+    queue.register("heartbeat", proctoring._write_heartbeats)
+    queue.register("violation", proctoring._write_violations)
+    return queue
+
+
+def _count(db_path, table):
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    cur.execute(f"SELECT COUNT(*) FROM {table}")
+    count = cur.fetchone()[0]
+    conn.close()
+    return count
+
+
+def test_heartbeat_without_exam_does_not_block_violations(db_path, monkeypatch):
+    queue = _queue(db_path)
+    monkeypatch.setattr(proctoring, "writer", queue)
+
+    proctoring.record_heartbeat("stu", None)
+    queue.enqueue("violation", ("other", "EX1", "tab_hidden", None, utc_now()))
+    queue.flush()
+    queue.stop()
+
+    assert queue.stats()["failures"] == 0
+    assert queue.depth() == 0
+    assert _count(db_path, "violations") == 1
+    conn = db.connect(db_path)
+    cur = conn.cursor()
+    cur.execute("SELECT user, exam_code FROM proctor_presence")
+    assert cur.fetchall() == [("stu", "")]
+    conn.close()
+
+
+def test_bad_record_is_dead_lettered_and_the_rest_written(db_path):
+    queue = _queue(db_path)
+    queue.register("presence", "INSERT INTO proctor_presence(user, exam_code, heartbeats) VALUES (?, ?, 0)")
+    queue.enqueue("presence", ("ok", "EX1"))
+    queue.enqueue("presence", ("bad", None))
+    queue.enqueue("violation", ("stu", "EX1", "tab_hidden", None, utc_now()))
+
+    assert queue.flush() == 2
+    queue.stop()
+
+    assert queue.depth() == 0
+    assert _count(db_path, "violations") == 1
+    assert _count(db_path, "proctor_presence") == 1
+    assert [(row["kind"], row["params"]) for row in queue.dead_letters()] == [("presence", ["bad", None])]
+
+
+def test_operational_error_requeues_with_backoff(db_path):
+    queue = _queue(db_path)
+    queue.register("missing", "INSERT INTO no_such_table(user) VALUES (?)")
+    queue.enqueue("missing", ("stu",))
+    queue.enqueue("violation", ("stu", "EX1", "tab_hidden", None, utc_now()))
+
+    assert queue.flush() == 1
+    first_retry = queue._retry_at
+    queue.flush()
+    stats = queue.stats()
+    queue.stop()
+
+    assert stats["depth"] == 1
+    assert stats["dead_lettered"] == 0
+    assert stats["failures"] == 2
+    assert queue._retry_at - first_retry > 0
+    assert _count(db_path, "violations") == 1
@@ -0,0 +1,262 @@
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+import database as db
+from proctor_ai import metrics
+
+logger = logging.getLogger(__name__)
+
+DB = "proctoring.db"
+
+ENABLED = os.getenv("PROCTOR_WRITE_BEHIND", "1") == "1"
+FLUSH_SIZE = int(os.getenv("PROCTOR_WRITE_BEHIND_BATCH", "500"))
+FLUSH_INTERVAL_S = float(os.getenv("PROCTOR_WRITE_BEHIND_INTERVAL_S", "1.0"))
+MAX_PENDING = int(os.getenv("PROCTOR_WRITE_BEHIND_MAX_PENDING", "100000"))
+# After a failed flush the writer waits RETRY_BASE_S, doubling per consecutive
+# failure up to RETRY_MAX_S, before trying again.
+RETRY_BASE_S = float(os.getenv("PROCTOR_WRITE_BEHIND_RETRY_S", "0.5"))
+RETRY_MAX_S = float(os.getenv("PROCTOR_WRITE_BEHIND_RETRY_MAX_S", "30"))
+# Records the database rejects are kept here (newest last) instead of retried.
+DEAD_LETTER_MAX = int(os.getenv("PROCTOR_WRITE_BEHIND_DEAD_LETTERS", "1000"))
+
+
+DB_WRITE_SECONDS = metrics.histogram(
+    "proctor_db_write_seconds", "Time to write one write-behind batch, per record kind.", ("kind",)
+)
+FLUSH_SECONDS = metrics.histogram("proctor_db_flush_seconds", "Time per write-behind flush, including commit.")
+FLUSHED_ROWS = metrics.counter("proctor_db_flushed_rows_total", "Records written by write-behind flushes.", ("kind",))
+DEAD_LETTERED = metrics.counter(
+    "proctor_db_dead_letter_total", "Records the database rejected and write-behind gave up on.", ("kind",)
+)
+
+
+def utc_now(offset_s=0):
+    # Same text format SQLite uses for CURRENT_TIMESTAMP, so buffered rows sort
+    # and compare like rows the database stamped itself.
+    moment = datetime.now(timezone.utc) + timedelta(seconds=offset_s)
+    return moment.strftime("%Y-%m-%d %H:%M:%S")
+
+
+class WriteBehindQueue:
+    """Buffers inserts and writes them in one transaction per flush.
+
+    Each record kind is registered with either an SQL statement (run through
+    ``executemany``) or a callable ``handler(cursor, rows)``. A flush happens
+    when ``FLUSH_SIZE`` records are pending or ``FLUSH_INTERVAL_S`` has passed,
+    and once more at interpreter exit.
+
+    If a flush fails, each kind is retried in its own transaction. A kind
+    that hits an operational error (locked or unreachable database) is
+    requeued and the writer backs off; any other error means some row is bad,
+    so that kind's records are retried one by one and those that still fail
+    are dead-lettered instead of blocking the queue.
+    """
+
+    def __init__(self, db_name=DB, flush_size=FLUSH_SIZE, flush_interval_s=FLUSH_INTERVAL_S):
+        self._db_name = db_name
+        self.flush_size = flush_size
+        self.flush_interval_s = flush_interval_s
+        self._handlers = {}
+        self._order = []
+        self._pending = deque()
+        self._dead_letters = deque(maxlen=DEAD_LETTER_MAX)
+        self._consecutive_failures = 0
+        self._retry_at = 0.0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._stopped = False
+        self._stats = {
+            "enqueued": 0,
+            "written": 0,
+            "dropped": 0,
+            "flushes": 0,
+            "failures": 0,
+            "dead_lettered": 0,
+            "max_depth": 0,
+            "last_flush_ms": 0.0,
+            "last_flush_rows": 0,
+        }
+
+    def register(self, kind, statement):
+        self._handlers[kind] = statement
+        if kind not in self._order:
+            self._order.append(kind)
+
+    def _start(self):
+        with self._cond:
+            if self._thread is not None or self._stopped:
+                return
+            self._thread = threading.Thread(target=self._run, name="write-behind", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, kind, params):
+        if kind not in self._handlers:
+            raise KeyError(f"Unregistered write-behind kind: {kind}")
+        if not ENABLED:
+            self._write([(kind, tuple(params))])
+            return
+
+        if self._thread is None:
+            self._start()
+        with self._cond:
+            if len(self._pending) >= MAX_PENDING:
+                self._stats["dropped"] += 1
+                logger.warning("write-behind queue full, dropping %s record", kind)
+                return
+            self._pending.append((kind, tuple(params)))
+            self._stats["enqueued"] += 1
+            depth = len(self._pending)
+            self._stats["max_depth"] = max(self._stats["max_depth"], depth)
+            if depth >= self.flush_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                # Back off after a failed flush, even when the queue is full.
+                while not self._stopped and time.monotonic() < self._retry_at:
+                    self._cond.wait(timeout=self._retry_at - time.monotonic())
+                if not self._stopped and len(self._pending) < self.flush_size:
+                    self._cond.wait(timeout=self.flush_interval_s)
+                stopped = self._stopped
+            self.flush()
+            if stopped:
+                return
+
+    def _write(self, records):
+        by_kind = {}
+        for kind, params in records:
+            by_kind.setdefault(kind, []).append(params)
+
+        conn = db.connect(self._db_name)
+        try:
+            cur = conn.cursor()
+            for kind in self._order:
+                rows = by_kind.get(kind)
+                if not rows:
+                    continue
+                statement = self._handlers[kind]
+                with DB_WRITE_SECONDS.time(kind):
+                    if callable(statement):
+                        statement(cur, rows)
+                    else:
+                        cur.executemany(statement, rows)
+                FLUSHED_ROWS.inc(kind, amount=len(rows))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _salvage(self, records):
+        # Returns (written, dead, unwritten): rows of a kind that hit an
+        # operational error are handed back to be retried after the backoff.
+        by_kind = {}
+        for kind, params in records:
+            by_kind.setdefault(kind, []).append(params)
+
+        written, dead, unwritten = 0, [], []
+        for kind in self._order:
+            rows = by_kind.get(kind)
+            if not rows:
+                continue
+            try:
+                self._write([(kind, params) for params in rows])
+                written += len(rows)
+                continue
+            except db.OperationalError:
+                unwritten += [(kind, params) for params in rows]
+                continue
+            except Exception:
+                pass
+            for index, params in enumerate(rows):
+                try:
+                    self._write([(kind, params)])
+                    written += 1
+                except db.OperationalError:
+                    unwritten += [(kind, rest) for rest in rows[index:]]
+                    break
+                except Exception as exc:
+                    dead.append((kind, params, repr(exc)))
+        return written, dead, unwritten
+
+    def _requeue(self, records):
+        # Back in front for the next attempt, within the cap. Caller holds _cond.
+        room = max(0, MAX_PENDING - len(self._pending))
+        self._pending.extendleft(reversed(records[:room]))
+        self._stats["dropped"] += len(records) - min(room, len(records))
+
+    def flush(self):
+        with self._flush_lock:
+            with self._cond:
+                records = list(self._pending)
+                self._pending.clear()
+            if not records:
+                return 0
+
+            started = time.monotonic()
+            written, dead, unwritten = len(records), [], []
+            try:
+                with FLUSH_SECONDS.time():
+                    self._write(records)
+            except Exception:
+                logger.exception("write-behind flush of %d records failed, retrying per kind", len(records))
+                written, dead, unwritten = self._salvage(records)
+
+            for kind, params, error in dead:
+                logger.error("write-behind dropped %s record %r: %s", kind, params, error)
+                DEAD_LETTERED.inc(kind)
+
+            with self._cond:
+                if dead or unwritten:
+                    self._stats["failures"] += 1
+                    self._consecutive_failures += 1
+                    delay = min(RETRY_MAX_S, RETRY_BASE_S * 2 ** (self._consecutive_failures - 1))
+                    self._retry_at = time.monotonic() + delay
+                else:
+                    self._consecutive_failures = 0
+                    self._retry_at = 0.0
+                self._requeue(unwritten)
+                self._dead_letters.extend(dead)
+                self._stats["dead_lettered"] += len(dead)
+                if written:
+                    self._stats["flushes"] += 1
+                    self._stats["written"] += written
+                    self._stats["last_flush_rows"] = written
+                    self._stats["last_flush_ms"] = (time.monotonic() - started) * 1000.0
+            return written
+
+    def stop(self):
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+
+    def depth(self):
+        with self._cond:
+            return len(self._pending)
+
+    def dead_letters(self):
+        with self._cond:
+            return [
+                {"kind": kind, "params": list(params), "error": error}
+                for kind, params, error in self._dead_letters
+            ]
+
+    def stats(self):
+        with self._cond:
+            data = dict(self._stats)
+            data["depth"] = len(self._pending)
+        data["enabled"] = ENABLED
+        return data
+
+
+writer = WriteBehindQueue()
+atexit.register(writer.stop)
+metrics.gauge("proctor_write_behind_depth", "Records waiting in the write-behind queue.", writer.depth)